@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import LoShu_backend
+import LoShu_metrics
+from LoShu_bulk import parse_record
+from LoShu_export import report_from_profile
+from LoShu_render import report_counts
+
+
+# --- HTTP API ---
+#
+# Usage: python LoShu_api.py --port 8000 --workers 4
+#        uvicorn LoShu_api:app --workers 4
+#
+#     GET /chart?name=Aisha&dob=1990-05-14&gender=Female    chart as JSON
+#     GET /reading?name=Aisha&dob=1990-05-14&gender=Female  reading as server-sent events
+#
+# Both also take day, month and year instead of dob, or a JSON body with the same fields via
+# POST (strings, with day, month and year as integers). The chart is the record LoShu_bulk
+# writes. The reading stream sends "chunk" events with {"text": ...}, then one "done" event, or
+# an "error" event if generation fails.
+#
+# Charts are computed on the event loop, as they take microseconds, and cached per profile.
+# Readings run on their own thread pool and are capped per worker process; when the cap is
+# reached /reading answers 503 at once, so LLM load never delays the chart path. A reading counts
+# against the cap until its pool thread is done with it, even after its client has gone, so the
+# pool never has readings queued behind the cap.
+
+# Readings streamed at once per worker process; override with LOSHU_API_READINGS.
+MAX_READINGS = int(os.environ.get("LOSHU_API_READINGS", 32))
+READING_RETRY_AFTER = 5
+CHART_CACHE_SIZE = 65536
+
+_reading_pool = ThreadPoolExecutor(max_workers=MAX_READINGS, thread_name_prefix="loshu-reading")
+_readings_in_flight = 0
+_readings_lock = threading.Lock()
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# JSON body fields and the types they must have; parse_record's int()/str() coercion is meant
+# for CSV text and would turn 1.5 into 1 and null into "None".
+_BODY_TYPES = {"name": str, "gender": str, "dob": str, "day": int, "month": int, "year": int}
+
+
+def _check_body(body):
+    if not isinstance(body, dict):
+        raise BadRequest("The request body must be a JSON object.")
+    for field, kind in _BODY_TYPES.items():
+        if field in body and (not isinstance(body[field], kind) or isinstance(body[field], bool)):
+            raise BadRequest(f"Field {field!r} must be {'an integer' if kind is int else 'a string'}.")
+
+
+async def _profile(request):
+    """(name, day, month, year, gender) from the query string or a JSON body."""
+    fields = dict(request.query_params)
+    if request.method == "POST":
+        try:
+            body = await request.json()
+        except ValueError:
+            raise BadRequest("The request body is not valid JSON.") from None
+        _check_body(body)
+        fields.update(body)
+    try:
+        name, day, month, year, gender = parse_record(fields)
+    except KeyError as e:
+        raise BadRequest(f"Missing field {e.args[0]!r}.") from None
+    except ValueError as e:
+        raise BadRequest(f"Invalid date of birth: {e}") from None
+    if not name:
+        raise BadRequest("The name must not be empty.")
+    if gender not in ("Male", "Female"):
+        raise BadRequest("Gender must be Male or Female.")
+    return name, day, month, year, gender
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _chart(name, day, month, year, gender, today):
+    return report_from_profile(name, day, month, year, gender, today=today)
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _chart_body(name, day, month, year, gender, today):
+    return json.dumps(_chart(name, day, month, year, gender, today)).encode()
+
+
+def _error(status, message, headers=None):
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+async def chart(request):
+    try:
+        profile = await _profile(request)
+    except BadRequest as e:
+        return _error(400, str(e))
+    return Response(_chart_body(*profile, date.today()), media_type="application/json")
+
+
+def _event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _pump(chunks, loop, queue, stop):
+    """Drives a reading generator on the reading pool, handing chunks to the event loop.
+
+    Releases the reading's place under MAX_READINGS when it returns.
+    """
+    try:
+        for chunk in chunks:
+            if stop.is_set():
+                break
+            loop.call_soon_threadsafe(queue.put_nowait, ("chunk", chunk))
+        loop.call_soon_threadsafe(queue.put_nowait, ("done", None))
+    except Exception as e:
+        LoShu_metrics.record_error("api_reading", e)
+        loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+    finally:
+        try:
+            chunks.close()
+        finally:
+            _reading_finished()
+
+
+def _reading_finished():
+    global _readings_in_flight
+    with _readings_lock:
+        _readings_in_flight -= 1
+
+
+async def _reading_events(queue, stop):
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "chunk":
+                yield _event("chunk", {"text": value})
+            elif kind == "done":
+                yield _event("done", {})
+                return
+            else:
+                yield _event("error", {"error": f"{type(value).__name__}: {value}", "retryable": isinstance(value, LoShu_backend.LLMUnavailableError)})
+                return
+    finally:
+        # A client that disconnects stops the stream at its next chunk; a shared generation still
+        # finishes and is cached.
+        stop.set()
+
+
+async def reading(request):
+    global _readings_in_flight
+    try:
+        profile = await _profile(request)
+    except BadRequest as e:
+        return _error(400, str(e))
+    chart = _chart(*profile, date.today())
+    with _readings_lock:
+        shed = _readings_in_flight >= MAX_READINGS
+        if not shed:
+            _readings_in_flight += 1
+    if shed:
+        LoShu_metrics.inc("loshu_api_shed_total", endpoint="reading")
+        return _error(503, "Too many readings in progress; retry shortly.", {"Retry-After": str(READING_RETRY_AFTER)})
+
+    # The pump starts here rather than in the response body, so it always runs and always gives
+    # back the reading's place, even if the client is gone before the response starts.
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    try:
+        chunks = LoShu_backend.stream_interpretation(
+            chart["name"], chart["day"], chart["month"], chart["year"], chart["gender"], chart["psychic"], chart["destiny"],
+            chart["kua"], chart["name_number"], chart["curr_year_num"], report_counts(chart), chart["completed_planes"], chart["incomplete_planes"],
+        )
+        loop.run_in_executor(_reading_pool, _pump, chunks, loop, queue, stop)
+    except BaseException:
+        _reading_finished()
+        raise
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_reading_events(queue, stop), media_type="text/event-stream", headers=headers)
+
+
+async def healthz(request):
+    return PlainTextResponse("ok")
+
+
+async def metrics(request):
+    return PlainTextResponse(LoShu_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/chart", chart, methods=["GET", "POST"]),
+    Route("/reading", reading, methods=["GET", "POST"]),
+    Route("/healthz", healthz),
+    Route("/metrics", metrics),
+])
+
+
+def main(argv=None):
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Serve Lo Shu charts and readings over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per CPU).")
+    args = parser.parse_args(argv)
+    uvicorn.run("LoShu_api:app", host=args.host, port=args.port, workers=args.workers, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
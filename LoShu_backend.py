@@ -1,92 +1,91 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-import re
-import pandas as pd
-import requests
+import asyncio
 import json
-from datetime import datetime, date
-import streamlit as st
+import os
+import time
+import warnings
+import pandas as pd
+from functools import lru_cache
+import LoShu_metrics
+from LoShu_cache import ReadingCache, reading_fingerprint
+from LoShu_fragments import DEFAULT_FRAGMENTS_PATH, FragmentLibrary
+from LoShu_llm import Endpoint, LLMUnavailableError, ResilientLLM, parse_endpoints, run_async
+from LoShu_prompts import SECTIONS, build_assembled_messages, build_messages, build_section_messages, chart_facts, token_usage
+from LoShu_singleflight import SingleFlight
+from LoShu_core import (
+    NAME_CHART, PLANES, PLANE_MASKS, ALL_PLANES_MASK, PLANE_COMPLETION, PLANE_NAME_SPLITS,
+    reduce_to_digit, calculate_name_number, calculate_numbers, personal_year, year_number, presence_mask, check_planes,
+)
 
 
-groq = st.secrets["Groq_API_Key"]
+MODEL_NAME = os.environ.get("LOSHU_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
 
+# Models tried, in order, when MODEL_NAME keeps failing: "model" or "model@base_url" entries
+# separated by commas. The config file can list them as "Fallbacks" instead.
+FALLBACK_MODELS = os.environ.get("LOSHU_FALLBACK_MODELS", "")
 
+# Sectioned readings: how many section requests may run at once. Each request is retried, and
+# falls back to other models, inside get_llm().
+SECTION_CONCURRENCY = 4
 
-llm = ChatGroq(
-    model="meta-llama/llama-4-scout-17b-16e-instruct",
-    groq_api_key=groq,
-    temperature=0
-    # other params...
-)
+# Optional JSON config file holding {"Groq_API_Key": "...", "Groq_API_Base": "...", "Fallbacks": [...]};
+# override with LOSHU_CONFIG. Each fallback is {"model": ..., "base_url": ..., "api_key": ...}.
+CONFIG_PATH = os.environ.get("LOSHU_CONFIG", "loshu_config.json")
 
 
-# --- Core Numerology Functions ---
-
-# Pythagorean numerology chart for name calculation
-NAME_CHART = {
-    'A': 1, 'J': 1, 'S': 1,
-    'B': 2, 'K': 2, 'T': 2,
-    'C': 3, 'L': 3, 'U': 3,
-    'D': 4, 'M': 4, 'V': 4,
-    'E': 5, 'N': 5, 'W': 5,
-    'F': 6, 'O': 6, 'X': 6,
-    'G': 7, 'P': 7, 'Y': 7,
-    'H': 8, 'Q': 8, 'Z': 8,
-    'I': 9, 'R': 9
-}
-
-def reduce_to_digit(n):
-    """Reduces a number to a single digit by summing its digits repeatedly."""
-    while n > 9:
-        n = sum(int(d) for d in str(n))
-    return n
-
-def calculate_name_number(name):
-    """Calculates the numerology number for a given name."""
-    name_sum = sum(NAME_CHART.get(char.upper(), 0) for char in name if char.isalpha())
-    return reduce_to_digit(name_sum)
-
-def calculate_numbers(name, day, month, year, gender):
-    """Calculates all the core numerological numbers and the counts for the grid."""
-    # Create the full date string to extract all digits.
-    date_str = f"{day:02d}{month:02d}{year}"
-    digits = [int(d) for d in date_str]
-
-    # Calculate Psychic, Destiny, and Year Sum numbers.
-    psychic = reduce_to_digit(day)
-    destiny = reduce_to_digit(sum(digits))
-    year_sum = reduce_to_digit(year)
-    name_number = calculate_name_number(name)
-
-    # Calculate Kua number based on gender.
-    kua = 0
-    if gender.lower() == "male":
-        kua = 11 - year_sum
-        if kua == 10:
-            kua = 1
-        if kua > 9:
-            kua = reduce_to_digit(kua)
-    else:  # female
-        kua = 4 + year_sum
-        if kua > 9:
-             kua = reduce_to_digit(kua)
-        
-
-    # IMPORTANT: The Name Number and Kua number are included in the list for the grid.
-    all_nums = [d for d in digits if d > 0] + [psychic, destiny, kua, name_number]
-    
-    # Count occurrences of each number from 1 to 9.
-    counts = {i: all_nums.count(i) for i in range(1, 10)}
-    
-    return counts, psychic, destiny, kua, name_number
+# --- LLM Client ---
+
+@lru_cache(maxsize=None)
+def load_config():
+    """Returns the contents of the JSON config file, or an empty dict if there is none."""
+    if not os.path.exists(CONFIG_PATH):
+        return {}
+    with open(CONFIG_PATH) as f:
+        return json.load(f)
+
+def resolve_api_key():
+    """Finds the Groq API key in the environment, the config file, or Streamlit secrets."""
+    key = os.environ.get("GROQ_API_KEY") or load_config().get("Groq_API_Key")
+    if key:
+        return key
+    try:
+        import streamlit as st
+        return st.secrets["Groq_API_Key"]
+    except (ImportError, KeyError, FileNotFoundError):
+        raise RuntimeError(
+            "No Groq API key found. Set GROQ_API_KEY, add Groq_API_Key to "
+            f"{CONFIG_PATH}, or add Groq_API_Key to the Streamlit secrets."
+        ) from None
+
+def resolve_api_base():
+    """Returns the chat-completions endpoint override, or None for Groq's own endpoint.
+
+    Set GROQ_API_BASE (or Groq_API_Base in the config file) to point the app at another
+    Groq-compatible server, such as the local stand-in in LoShu_fake_llm.
+    """
+    return os.environ.get("GROQ_API_BASE") or load_config().get("Groq_API_Base")
+
+def llm_endpoints():
+    """The primary model and its fallbacks, in the order they are tried.
+
+    Fallbacks without their own endpoint or key use those of the primary model.
+    """
+    api_key, base_url = resolve_api_key(), resolve_api_base()
+    fallbacks = parse_endpoints(FALLBACK_MODELS) or [Endpoint(**entry) for entry in load_config().get("Fallbacks", [])]
+    return [Endpoint(MODEL_NAME, base_url, api_key)] + [
+        Endpoint(fallback.model, fallback.base_url or base_url, fallback.api_key or api_key) for fallback in fallbacks
+    ]
 
-def year_number(day, month):
-    current_date = date.today()
-    current_year = current_date.year
-    date_str = f"{day:02d}{month:02d}{current_year}"
-    digits = [int(d) for d in date_str]
-    curr_year_num = reduce_to_digit(sum(digits))
-    return curr_year_num
+@lru_cache(maxsize=None)
+def get_llm():
+    """Returns the shared LLM client, creating it on first use.
+
+    It has the invoke/stream/ainvoke interface of a LangChain chat model, with the deadlines,
+    retries, hedging and fallbacks of LoShu_llm.ResilientLLM.
+    """
+    return ResilientLLM.for_endpoints(llm_endpoints())
+
+
+# --- Grid Display ---
 
 def build_grid_dataframe(counts):
     """Constructs the Lo Shu Grid as a Pandas DataFrame."""
@@ -115,195 +114,166 @@ def build_grid_dataframe(counts):
     )
     return df
 
-def check_planes(counts):
-    """Checks for completed horizontal, vertical, and diagonal planes."""
-    planes_list = {
-        "Mental Plane (4-9-2)": [4, 9, 2],
-        "Emotional Plane (3-5-7)": [3, 5, 7],
-        "Practical Plane (8-1-6)": [8, 1, 6],
-        "Thought Plane (4-3-8)": [4, 3, 8],
-        "Will Plane (9-5-1)": [9, 5, 1],
-        "Action Plane (2-7-6)": [2, 7, 6],
-        "Determination Plane (4-5-6)": [4, 5, 6],
-        "Compassion Plane (2-5-8)": [2, 5, 8]
-    }
-    completed = []
-    incompleted = []
-    for name, numbers in planes_list.items():
-        if all(counts.get(num, 0) > 0 for num in numbers):
-            completed.append(name)
-        else:
-            incompleted.append(name)
-    return completed, incompleted
 
 # --- AI Interpretation Function ---
 
+@lru_cache(maxsize=None)
+def get_reading_cache():
+    """Returns the process-wide reading cache, opening the on-disk store on first use."""
+    return ReadingCache()
+
+@lru_cache(maxsize=None)
+def get_fragment_library():
+    """Returns the fragment library, or None to have the LLM write whole readings.
+
+    The library is used when DEFAULT_FRAGMENTS_PATH holds an up-to-date one; build it with
+    LoShu_fragments.py. A stale or incomplete library is ignored with a warning.
+    """
+    if not os.path.exists(DEFAULT_FRAGMENTS_PATH):
+        return None
+    try:
+        return FragmentLibrary.load(DEFAULT_FRAGMENTS_PATH)
+    except ValueError as e:
+        warnings.warn(f"Ignoring the fragment library: {e}")
+        return None
+
+def reading_model_key():
+    """The model part of single-request reading cache keys; assembled readings get their own."""
+    library = get_fragment_library()
+    return MODEL_NAME if library is None else f"{MODEL_NAME}:fragments:{library.version}"
+
+def sectioned_model_key():
+    """The model part of sectioned reading cache keys."""
+    return f"{MODEL_NAME}:sectioned"
+
+def _reading_request(library, name, counts, psychic, destiny, kua, name_number, completed_planes, facts):
+    """Returns (prefix, messages): the text assembled from the library, and the live request."""
+    if library is None:
+        return "", build_messages(facts)
+    with LoShu_metrics.span("assemble_fragments"):
+        prefix = library.assemble(name, counts, psychic, destiny, kua, name_number, completed_planes)
+    return prefix, build_assembled_messages(facts)
+
+# Identical readings requested while one is already being generated wait for that generation
+# instead of starting their own LLM call. Streamed and whole readings coalesce separately.
+_reading_flights = SingleFlight(on_join=lambda key, leader: LoShu_metrics.record_flight("reading", leader))
+_stream_flights = SingleFlight(on_join=lambda key, leader: LoShu_metrics.record_flight("stream", leader))
+_sectioned_flights = SingleFlight(on_join=lambda key, leader: LoShu_metrics.record_flight("sectioned", leader))
+
 def generate_interpretation(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes):
-    """Fetches a numerological interpretation"""
-    grid_data = ", ".join([f"{num} (appears {count} time{'s' if count > 1 else ''})" for num, count in counts.items() if count > 0])
-    missing_numbers = ", ".join([str(num) for num, count in counts.items() if count == 0])
-    completed_planes_str = ", ".join(completed_planes) if completed_planes else 'None'
-    incomplete_planes_str = ", ".join(incomplete_planes) if incomplete_planes else 'None'
-    
-    template = f"""
-        You are a master numerologist with deep expertise in Lo Shu Grid analysis, Chinese metaphysics, and Vedic numerology. Provide a detailed, insightful, and holistic analysis of a person's complete numerological profile based ONLY on the data provided. Please don't invent or assume any information.
-        Write in a warm, encouraging, and empowering tone, using clear structure with main headings marked as ## and subheadings marked as ###. Use plain text without markdown bolding.
-
-
-        **Person's Data:**
-        - First Name: {name}
-        - Date of Birth: {day}-{month}-{year}
-        - Gender: {gender}
-        - Psychic Number (Birth Number): {psychic}
-        - Destiny Number (Life Path Number): {destiny}
-        - Name Number (Expression Number): {name_number}
-        - Kua Number: {kua}
-        - Numbers in their chart: {grid_data or 'None'}
-        - Missing Numbers: {missing_numbers or 'None'}
-        - Completed Planes: {completed_planes_str}
-        - Incomplete Planes: {incomplete_planes_str}
-        - Year Number (Current Year Number): {curr_year_num}
-
-        **Analysis Request:**
-        Please provide a comprehensive reading covering the following aspects, ensuring the analysis of planes is based on the provided 'Completed Planes' {completed_planes_str} and 'Incomplete Planes' {incomplete_planes_str} lists.
-
-        ## 1. Individual Squares Analysis
-For each square (1–9), provide:
-### Square
-- Planet, Element, Direction, Season, Symbolic Colours
-- Life area (e.g., Wealth, Relationships, Creativity)
-- Strength level (based on count) and its influence
-- Real-life example or anecdote demonstrating this energy
-
-## 2. Plane Significance
-
-### Mental Plane (4-9-2):
-Discuss the intellect, logic, and analytical thinking based on:
-- The strength (count/ frequency of each square) in the Mental Plane (4-9-2).
-- Whether the Mental Plane (4-9-2) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Emotional Plane (3-5-7)
-Discuss the feelings, intuition, and emotional sensitivity based on:
-- The strength (count/ frequency of each square) in the Emotional Plane (3-5-7).
-- Whether the Emotional Plane (3-5-7) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Practical Plane (8-1-6)
-Discuss the ability to manifest ideas in the material world based on:
-- The strength (count/ frequency of each square) in the Practical Plane (8-1-6).
-- Whether the Practical Plane (8-1-6) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Thought Plane (4-3-8)
-Discuss the ability to generate new ideas and to think in an orderly and methodical manner based on:
-- The strength (count/ frequency of each square) in the Thought Plane (4-3-8).
-- Whether the Thought Plane (4-3-8) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Will Plane (9-5-1)
-Discuss the willpower, persistence, and determination to achieve the goals based on:
-- The strength (count/ frequency of each square) in the Will Plane (9-5-1).
-- Whether the Will Plane (9-5-1) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Action Plane (2-7-6)
-Discuss the ability to put their thoughts and plans into action based on:
-- The strength (count/ frequency of each square) in the Action Plane (2-7-6).
-- Whether the Action Plane (2-7-6) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Determination Plane (4-5-6)
-Discuss the "Rajat Yog" and material assets, specifically land and property, based on:
-- The strength (count/ frequency of each square) in the Determination Plane (4-5-6).
-- Whether the Determination Plane (4-5-6) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-### Compassion Plane (2-5-8)
-Discuss the "Raj Yog" and success, wealth, name, and fame based on:
-- The strength (count/ frequency of each square) in the Compassion Plane (2-5-8).
-- Whether the Compassion Plane (2-5-8) is in the 'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
-
-## 3. Core Number Analysis for {name}
-### Psychic Number ({psychic})
-Discuss inner self, desires, and interpersonal perception based on the Psychic Number ({psychic}) and the planet associated with it.
-### Destiny Number ({destiny})
-Discuss life purpose, karmic lessons, and ultimate goals based on the Destiny Number ({destiny}) and the planet associated with it.
-### Name Number ({name_number})
-Discuss talents, modes of expression, and professional potential based on the Name Number ({name_number}) and the planet associated with it.
-### Kua Number ({kua})
-Discuss personal energy type, favourable directions, compatible elements, and Feng Shui tips based on the Kua Number ({kua}) and the planet associated with it.
-
-### Discuss the combinations of these numbers based on the planets they govern and the mutual relationship (synergy and enmity) of those planets.
-
-## 4. Life Domains
-### Education & Learning
-Assess learning style, optimal study methods, and academic strengths based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Square 8: Strength of Square 8 in the Lo Shu Grid.
-### Career & Profession
-Identify suitable fields, work style, leadership qualities, and entrepreneurial potential based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Square 1: Strength of Square 1 in the Lo Shu Grid.
-### Finances & Wealth
-Evaluate money management, investment outlook, property and luxury inclinations, and legal considerations based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Square 4: Strength of Square 4 in the Lo Shu Grid.
-### Travel & Exploration
-Indicate favourable travel directions, how journeys support growth, and auspicious timing based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Square 6: Strength of Square 6 in the Lo Shu Grid.
-### Family & Relationships
-Examine married life, interpersonal harmony, and children based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Square 2: Strength of Square 2 in the Lo Shu Grid.
-### Health & Wellness
-Discuss critical health issues and recommend physical and mental health strategies, and longevity practices based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Square 3: Strength of Square 3 in the Lo Shu Grid.
-### Age-Related Phases
-Highlight life periods of opportunity and challenge as per numerological cycles based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Associated squares (Squares, 3, 6, 2, 7) strength in the Lo Shu Grid.
-### Challenges & Opportunities
-Summarise major life challenges and potential breakthroughs, with targeted remedies and affirmations based on:
--'Completed Planes' {completed_planes_str} or 'Incomplete Planes' {incomplete_planes_str} list.
--Associated squares (Square 1 and Square 9) strength in the Lo Shu Grid.
-
-## 5. Current Year Analysis
-
-Perform the analysis of the current year based on the combination of the current year number {curr_year_num} and the destiny number {destiny}.
-Look at the planets associated with these numbers. Additionally, consider the mutual synergy and enmity between these planets.
-Provide a very detailed and elaborate analysis for the current year's events, challenges, and opportunities in each of the following fields:
-- Health: discuss in detail in at least 200 words
-- Family & Relationships: discuss in detail in at least 200 words
-- Education: discuss in detail in at least 200 words
-- Career: discuss in detail in at least 200 words
-- Money and Savings: discuss in detail in at least 200 words
-- Overall Happiness: discuss in detail in at least 200 words
-
-## 6. Holistic Synthesis
-Integrate all numbers into a cohesive life-purpose narrative, illustrating how strengths overcome gaps and how challenges become catalysts for growth.
-
-## 7. Action Plan & Affirmations
-- **Immediate Steps (Next 30 Days):** Three concrete actions.
-- **Long-Term Goals (Next Year):** Major milestones aligned with numerology.
-- **Remedies:** Identify the squares (at least 3 to 4) which are relatively weak, negative or have missing numbers in the Lo Shu Grid. Identify planets associated with these weak, empty and negative squares. Suggest the remedies related to these planets (as per Vedic Astrology) to strengthen these weak, negative and missing squares. 
-
-## 8. Final Wisdom
-Conclude with an inspiring message that highlights the person’s soul mission, unique gifts, and the pathways to a fulfilling, balanced life.
-        **Final Wisdom:**
-        Conclude with an inspiring message about their unique gifts, soul purpose, and the beautiful journey their numbers reveal.
-        Please ensure every section provides specific, actionable insights tailored to this person's unique numerological blueprint.
+    """Fetches a numerological interpretation, serving repeated profiles from the reading cache.
+
+    With a fragment library, sections 1 to 4 are assembled from it and the LLM writes the rest.
+    """
+    cache = get_reading_cache()
+    library = get_fragment_library()
+    cache_key = reading_fingerprint(reading_model_key(), name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+    cached = cache.get(cache_key)
+    LoShu_metrics.record_cache(cached is not None)
+    if cached is not None:
+        return cached
+
+    facts = chart_facts(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+    return _reading_flights.do(cache_key, lambda: _generate_reading(
+        *_reading_request(library, name, counts, psychic, destiny, kua, name_number, completed_planes, facts), cache, cache_key
+    ))
+
+def _generate_reading(prefix, messages, cache, cache_key):
+    # A generation that finished between our cache miss and joining the flight has cached its reading.
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with LoShu_metrics.span("llm_reading"):
+        response = get_llm().invoke(messages)
+    LoShu_metrics.record_tokens(token_usage(messages, response.content, response.usage_metadata))
+    reading = prefix + response.content
+    cache.put(cache_key, reading)
+    return reading
+
+def stream_interpretation(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes):
+    """Yields a numerological interpretation chunk by chunk as the model generates it.
+
+    A cached reading is yielded in one piece. Callers asking for a reading that is already
+    streaming for someone else replay its chunks so far and then follow it live. The stream is
+    generated in the background, so the reading is still finished and cached if the caller stops
+    reading early. With a fragment library, the assembled sections are yielded at once and only
+    the rest is streamed from the LLM.
     """
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm
-    response = chain.invoke({
-        "name": name,
-        "day": day,
-        "month": month,
-        "year": year,
-        "gender": gender,
-        "psychic": psychic,
-        "destiny": destiny,
-        "kua": kua,
-        "name_number": name_number,
-        "curr_year_num": curr_year_num,
-        "counts": counts,
-        "completed_planes": completed_planes,
-        "incomplete_planes": incomplete_planes
-        })
+    cache = get_reading_cache()
+    library = get_fragment_library()
+    cache_key = reading_fingerprint(reading_model_key(), name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+    cached = cache.get(cache_key)
+    LoShu_metrics.record_cache(cached is not None)
+    if cached is not None:
+        yield cached
+        return
+
+    facts = chart_facts(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+    yield from _stream_flights.stream(cache_key, lambda: _stream_reading(
+        *_reading_request(library, name, counts, psychic, destiny, kua, name_number, completed_planes, facts), cache, cache_key
+    ))
+
+def _stream_reading(prefix, messages, cache, cache_key):
+    cached = cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    if prefix:
+        yield prefix
+    parts = []
+    usage = None
+    with LoShu_metrics.span("llm_stream"):
+        started = time.perf_counter()
+        for chunk in get_llm().stream(messages):
+            if chunk.usage_metadata:
+                usage = chunk.usage_metadata
+            if chunk.content:
+                if not parts:
+                    LoShu_metrics.observe("loshu_llm_ttft_seconds", time.perf_counter() - started)
+                parts.append(chunk.content)
+                yield chunk.content
+    completion = "".join(parts)
+    LoShu_metrics.record_tokens(token_usage(messages, completion, usage))
+    cache.put(cache_key, prefix + completion)
+
+async def _generate_section(section, facts, semaphore):
+    """Generates one section of a reading; get_llm() retries a failed request on its own."""
+    messages = build_section_messages(section, facts)
+    async with semaphore:
+        with LoShu_metrics.span("llm_section", section=section):
+            response = await get_llm().ainvoke(messages)
+    LoShu_metrics.record_tokens(token_usage(messages, response.content, response.usage_metadata), request=f"section:{section}")
     return response.content
+
+async def agenerate_interpretation_sectioned(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes, max_concurrency=SECTION_CONCURRENCY):
+    """Generates a reading as one focused request per section, run concurrently.
+
+    Latency is roughly that of the slowest section rather than the sum of all of them. Sections
+    are assembled in reading order. Cached readings are keyed separately from single-request ones.
+    """
+    cache = get_reading_cache()
+    cache_key = reading_fingerprint(sectioned_model_key(), name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+    cached = cache.get(cache_key)
+    LoShu_metrics.record_cache(cached is not None)
+    if cached is not None:
+        return cached
+
+    facts = chart_facts(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+    return await _sectioned_flights.ado(cache_key, lambda: _generate_sectioned(facts, cache, cache_key, max_concurrency))
+
+async def _generate_sectioned(facts, cache, cache_key, max_concurrency):
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    semaphore = asyncio.Semaphore(max_concurrency)
+    sections = await asyncio.gather(*(_generate_section(section, facts, semaphore) for section in SECTIONS))
+    reading = "\n\n".join(section.strip() for section in sections)
+    cache.put(cache_key, reading)
+    return reading
+
+def generate_interpretation_sectioned(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes, max_concurrency=SECTION_CONCURRENCY):
+    """Synchronous wrapper around agenerate_interpretation_sectioned, run on the shared LLM event loop."""
+    return run_async(agenerate_interpretation_sectioned(
+        name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes,
+        max_concurrency=max_concurrency,
+    ))
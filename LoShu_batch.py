@@ -0,0 +1,139 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from LoShu_core import NAME_CHART, PLANE_COMPLETION, PLANES
+
+
+# --- Vectorized Batch Engine ---
+
+# Grid numbers of each plane as an (8, 3) array, rows in the same order as PLANES.
+PLANE_NAMES = list(PLANES)
+PLANE_NUMBERS = np.array(list(PLANES.values()), dtype=np.uint8)
+_PLANE_COMPLETION = np.array(PLANE_COMPLETION, dtype=np.uint8)
+_BITS = np.arange(9, dtype=np.uint16)
+
+# Letter value of every byte, upper and lower case; other bytes score 0 like non-letters.
+_LETTER_VALUES = np.zeros(256, dtype=np.uint8)
+for _letter, _value in NAME_CHART.items():
+    _LETTER_VALUES[ord(_letter)] = _LETTER_VALUES[ord(_letter.lower())] = _value
+
+
+class ChartBatch(NamedTuple):
+    """Charts for N people: grid counts, core numbers and plane completion as arrays."""
+    counts: np.ndarray        # (N, 9) uint8, column i holds the count of number i + 1
+    psychic: np.ndarray       # (N,) uint8
+    destiny: np.ndarray       # (N,) uint8
+    kua: np.ndarray           # (N,) uint8
+    name_number: np.ndarray   # (N,) uint8
+    planes: np.ndarray        # (N, 8) bool, columns in PLANE_NAMES order
+
+
+def digital_root(n):
+    """Vectorized reduce_to_digit for non-negative integers."""
+    n = np.asarray(n, dtype=np.int64)
+    return np.where(n > 0, 1 + (n - 1) % 9, 0).astype(np.uint8)
+
+
+def name_sums(names):
+    """Letter sums (before reduction) of a sequence of names, as an int64 array.
+
+    ASCII names are scored in one pass: all names are joined into one byte buffer, mapped
+    through a byte lookup table and summed per name with a cumulative sum. The rare names with
+    other characters are scored by calculate_name_number's rules one at a time.
+    """
+    names = list(names)
+    lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    # "replace" keeps one byte per character, so the name boundaries stay where they are.
+    values = _LETTER_VALUES[np.frombuffer("".join(names).encode("ascii", "replace"), dtype=np.uint8)]
+    totals = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+    ends = np.cumsum(lengths)
+    sums = totals[ends] - totals[ends - lengths]
+    for i, name in enumerate(names):
+        if not name.isascii():
+            sums[i] = sum(NAME_CHART.get(char.upper(), 0) for char in name if char.isalpha())
+    return sums
+
+
+def name_numbers_batch(names):
+    """Vectorized calculate_name_number over a sequence of names, as a uint8 array."""
+    return digital_root(name_sums(names))
+
+
+def _is_male(genders):
+    genders = np.asarray(genders)
+    if genders.dtype == bool:
+        return genders
+    return np.char.lower(genders.astype(str)) == "male"
+
+
+def calculate_numbers_batch(days, months, years, genders, name_numbers):
+    """Vectorized calculate_numbers over arrays of birth dates, genders and name numbers.
+
+    Returns the (N, 9) count matrix and the psychic, destiny, kua and name-number vectors.
+    Genders may be "Male"/"Female" strings (anything other than "male" counts as female, as
+    in calculate_numbers) or a boolean is-male array.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    years = np.asarray(years, dtype=np.int64)
+    name_numbers = np.asarray(name_numbers, dtype=np.uint8)
+    if np.any((years < 1) | (years > 9999)):
+        raise ValueError("Years must be between 1 and 9999.")
+
+    # The eight digits of DDMMYYYY; the zero padding of short years drops out with the zeros.
+    digits = np.stack([
+        days // 10, days % 10,
+        months // 10, months % 10,
+        years // 1000, years // 100 % 10, years // 10 % 10, years % 10,
+    ], axis=1)
+
+    psychic = digital_root(days)
+    destiny = digital_root(digits.sum(axis=1))
+    year_sum = digital_root(years).astype(np.int64)
+
+    male_kua = 11 - year_sum
+    male_kua = np.where(male_kua == 10, 1, male_kua)
+    female_kua = digital_root(4 + year_sum)
+    kua = np.where(_is_male(genders), male_kua, female_kua).astype(np.uint8)
+
+    all_nums = np.concatenate([
+        digits.astype(np.uint8),
+        np.stack([psychic, destiny, kua, name_numbers], axis=1),
+    ], axis=1)
+    counts = np.stack([(all_nums == num).sum(axis=1) for num in range(1, 10)], axis=1).astype(np.uint8)
+    return counts, psychic, destiny, kua, name_numbers
+
+
+def presence_masks(counts):
+    """Packs an (N, 9) count matrix into 9-bit presence masks, as in LoShu_core.presence_mask."""
+    return ((np.asarray(counts) > 0).astype(np.uint16) << _BITS).sum(axis=1, dtype=np.uint16)
+
+
+def completed_plane_masks(counts):
+    """Completed-plane bitmasks for an (N, 9) count matrix, via the 512-entry plane table."""
+    return _PLANE_COMPLETION[presence_masks(counts)]
+
+
+def check_planes_batch(counts):
+    """Vectorized check_planes: an (N, 8) boolean matrix of completed planes."""
+    completed = completed_plane_masks(counts)
+    return (completed[:, None] >> np.arange(len(PLANES), dtype=np.uint8)) & 1 == 1
+
+
+def calculate_batch(days, months, years, genders, name_numbers):
+    """Computes full charts, including plane completion, for arrays of people."""
+    counts, psychic, destiny, kua, name_number = calculate_numbers_batch(days, months, years, genders, name_numbers)
+    return ChartBatch(counts, psychic, destiny, kua, name_number, check_planes_batch(counts))
+
+
+def calculate_batch_frame(df, day="day", month="month", year="year", gender="gender", name_number="name_number", name="name"):
+    """Computes charts for a pandas DataFrame of people.
+
+    Uses the `name_number` column when present and otherwise scores the `name` column.
+    """
+    if name_number in df.columns:
+        name_numbers = df[name_number].to_numpy()
+    else:
+        name_numbers = name_numbers_batch(df[name])
+    return calculate_batch(df[day].to_numpy(), df[month].to_numpy(), df[year].to_numpy(), df[gender].to_numpy(), name_numbers)
@@ -0,0 +1,216 @@
+import argparse
+import gc
+import json
+import platform
+import string
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+import LoShu_backend
+from LoShu_batch import calculate_batch
+from LoShu_cache import ReadingCache
+from LoShu_chart import Chart
+from LoShu_core import calculate_name_number, calculate_numbers, check_planes, reduce_to_digit, year_number
+from LoShu_render import create_grid_html
+
+
+# --- Benchmark Suite ---
+#
+# Usage: python LoShu_bench.py --save bench_baseline.json
+#        python LoShu_bench.py --compare bench_baseline.json --tolerance 0.2
+#
+# Everything runs on synthetic records from a fixed seed, and readings come from a local fake
+# chat model, so results are reproducible and cost no API quota.
+
+SEED = 1234
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Above this many records the scalar (one call per person) path is skipped; it would take minutes.
+DEFAULT_SCALAR_MAX = 100_000
+FAKE_READING = " ".join(["Your chart shows balance between intellect and action."] * 400)
+
+
+def synthetic_records(n, seed=SEED):
+    """Returns arrays of n random birth dates (1900 through 2025), genders and first names."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("1900-01-01")
+    dates = start + rng.integers(0, (np.datetime64("2026-01-01") - start).astype(int), n)
+    years = dates.astype("M8[Y]").astype(np.int64) + 1970
+    months = dates.astype("M8[M]").astype(np.int64) % 12 + 1
+    days = (dates - dates.astype("M8[M]")).astype(np.int64) + 1
+    genders = np.where(rng.random(n) < 0.5, "Male", "Female")
+    letters = np.array(list(string.ascii_lowercase))
+    lengths = rng.integers(3, 10, n)
+    names = ["".join(rng.choice(letters, length)).title() for length in lengths[:min(n, 10_000)]]
+    names = [names[i % len(names)] for i in range(n)]
+    return days, months, years, genders, names
+
+
+def measure(name, fn, args_list, setup=None):
+    """Times fn once per argument tuple and reports ops/sec with p50/p99 latency in microseconds."""
+    timings = np.empty(len(args_list), dtype=np.int64)
+    gc.disable()
+    try:
+        for i, args in enumerate(args_list):
+            if setup:
+                setup()
+            started = time.perf_counter_ns()
+            fn(*args)
+            timings[i] = time.perf_counter_ns() - started
+    finally:
+        gc.enable()
+    return {
+        "name": name,
+        "ops_per_sec": 1e9 / timings.mean(),
+        "p50_us": float(np.percentile(timings, 50)) / 1e3,
+        "p99_us": float(np.percentile(timings, 99)) / 1e3,
+    }
+
+
+def measure_batch(name, fn, n, repeats=3):
+    """Times a call that processes n records, best of `repeats`, and reports records/sec."""
+    elapsed = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        elapsed = min(elapsed, time.perf_counter() - started)
+    return {"name": name, "ops_per_sec": n / elapsed, "seconds": elapsed}
+
+
+def bytes_per_chart(name, build, n):
+    """Memory retained by n charts built by `build`, and the peak while building them, per chart."""
+    gc.collect()
+    tracemalloc.start()
+    charts = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del charts
+    return {"name": name, "bytes_per_chart": retained / n, "peak_bytes_per_chart": peak / n}
+
+
+@contextmanager
+def fake_llm():
+    """Points the backend at a deterministic fake chat model and an in-memory reading cache."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    model = FakeListChatModel(responses=[FAKE_READING])
+    cache = ReadingCache(":memory:")
+    original_llm, original_cache = LoShu_backend.get_llm, LoShu_backend.get_reading_cache
+    LoShu_backend.get_llm = lambda: model
+    LoShu_backend.get_reading_cache = lambda: cache
+    try:
+        yield cache
+    finally:
+        LoShu_backend.get_llm, LoShu_backend.get_reading_cache = original_llm, original_cache
+        cache.close()
+
+
+def run_single(iterations=20_000):
+    """Per-call latency of the scalar functions on synthetic records."""
+    days, months, years, genders, names = synthetic_records(iterations)
+    people = list(zip(names, days.tolist(), months.tolist(), years.tolist(), genders.tolist()))
+    charts = [calculate_numbers(*person) for person in people]
+    counts_list = [(chart[0],) for chart in charts]
+    return [
+        measure("reduce_to_digit", reduce_to_digit, [(int(y) * 37,) for y in years]),
+        measure("calculate_name_number", calculate_name_number, [(name,) for name in names]),
+        measure("calculate_numbers", calculate_numbers, people),
+        measure("year_number", year_number, [(d, m) for _, d, m, _, _ in people]),
+        measure("check_planes", check_planes, counts_list),
+        measure("build_grid_dataframe", LoShu_backend.build_grid_dataframe, counts_list[:2_000]),
+        measure("create_grid_html", create_grid_html, counts_list),
+    ]
+
+
+def run_reading(iterations=200):
+    """End-to-end generate_interpretation against the fake model, for cache misses and hits."""
+    days, months, years, genders, names = synthetic_records(iterations)
+    readings = []
+    for name, day, month, year, gender in zip(names, days.tolist(), months.tolist(), years.tolist(), genders.tolist()):
+        counts, psychic, destiny, kua, name_number = calculate_numbers(name, day, month, year, gender)
+        completed, incomplete = check_planes(counts)
+        readings.append((name, day, month, year, gender, psychic, destiny, kua, name_number, year_number(day, month), counts, completed, incomplete))
+    with fake_llm() as cache:
+        miss = measure("generate_interpretation (miss)", LoShu_backend.generate_interpretation, readings, setup=cache.clear)
+        for reading in readings:
+            LoShu_backend.generate_interpretation(*reading)
+        hit = measure("generate_interpretation (hit)", LoShu_backend.generate_interpretation, readings)
+    return [miss, hit]
+
+
+def run_batches(sizes, scalar_max=DEFAULT_SCALAR_MAX):
+    """Throughput and memory per chart for batches of synthetic records."""
+    results = []
+    for n in sizes:
+        days, months, years, genders, names = synthetic_records(n)
+        name_numbers = np.fromiter((calculate_name_number(name) for name in names), dtype=np.uint8, count=n)
+        results.append(measure_batch(f"calculate_batch[{n}]", lambda: calculate_batch(days, months, years, genders, name_numbers), n))
+        if n <= scalar_max:
+            people = list(zip(names, days.tolist(), months.tolist(), years.tolist(), genders.tolist()))
+            results.append(measure_batch(f"scalar calculate_numbers+check_planes[{n}]", lambda: [check_planes(calculate_numbers(*p)[0]) for p in people], n))
+            results.append(bytes_per_chart(f"memory dict chart[{n}]", lambda: [calculate_numbers(*p) for p in people], n))
+            results.append(bytes_per_chart(f"memory Chart[{n}]", lambda: [Chart.calculate(*p) for p in people], n))
+        results.append(bytes_per_chart(f"memory ChartBatch[{n}]", lambda: calculate_batch(days, months, years, genders, name_numbers), n))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of benchmarks whose throughput fell more than `tolerance` below baseline."""
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if not before or "ops_per_sec" not in result:
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        result["change"] = change
+        if change < -tolerance:
+            regressions.append(result["name"])
+    return regressions
+
+
+def format_result(result):
+    if "bytes_per_chart" in result:
+        line = f"{result['name']:<50} {result['bytes_per_chart']:>12.1f} bytes/chart   peak {result['peak_bytes_per_chart']:.1f}"
+    else:
+        line = f"{result['name']:<50} {result['ops_per_sec']:>12,.0f} ops/s"
+        if "p50_us" in result:
+            line += f"   p50 {result['p50_us']:>9.2f} us   p99 {result['p99_us']:>9.2f} us"
+    if "change" in result:
+        line += f"   {result['change']:+.1%} vs baseline"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Lo Shu core, rendering and reading paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Batch sizes to run.")
+    parser.add_argument("--scalar-max", type=int, default=DEFAULT_SCALAR_MAX, help="Largest batch also run through the scalar path.")
+    parser.add_argument("--iterations", type=int, default=20_000, help="Calls per single-call benchmark.")
+    parser.add_argument("--save", help="Write the results to this JSON file as a new baseline.")
+    parser.add_argument("--compare", help="Compare against a baseline JSON file and exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop before a regression is reported.")
+    args = parser.parse_args(argv)
+
+    results = run_single(args.iterations) + run_reading() + run_batches(args.sizes, args.scalar_max)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    for result in results:
+        print(format_result(result))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results}, f, indent=2)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
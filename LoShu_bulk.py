@@ -0,0 +1,237 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import LoShu_backend
+from LoShu_cache import reading_fingerprint
+from LoShu_core import calculate_numbers, check_planes, year_number
+from LoShu_prompts import SECTIONS
+
+
+# --- Bulk Pipeline ---
+#
+# Usage: python LoShu_bulk.py people.csv readings.jsonl --concurrency 8 --rate 30
+#
+# Input records need a name, a gender and a date of birth, given either as day/month/year
+# columns or as a single dob column (DD-MM-YYYY or YYYY-MM-DD). An optional id column names
+# each record; otherwise its row number is used. Finished record ids are appended to a
+# checkpoint file next to the output, so an interrupted run skips them when restarted.
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly to at most `per_minute` a minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, permits=1):
+        """Waits until `permits` more calls fit under the rate."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next - now
+            self._next = max(now, self._next) + permits * self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def read_records(path, fmt):
+    """Yields (record_id, record) pairs from a CSV or JSONL file without loading it whole."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row_number, row in enumerate(rows, start=1):
+            yield str(row.get("id") or row_number), row
+
+
+def parse_record(row):
+    """Extracts (name, day, month, year, gender) from an input record."""
+    if row.get("dob"):
+        dob = str(row["dob"]).strip()
+        parsed = datetime.strptime(dob, "%Y-%m-%d" if dob[4:5] == "-" else "%d-%m-%Y")
+        day, month, year = parsed.day, parsed.month, parsed.year
+    else:
+        day, month, year = int(row["day"]), int(row["month"]), int(row["year"])
+        datetime(year, month, day)
+    return str(row["name"]).strip(), day, month, year, str(row["gender"]).strip().title()
+
+
+def process_record(record_id, row, with_reading, sectioned, limiter):
+    """Computes the grid for one record and, if asked, its reading."""
+    name, day, month, year, gender = parse_record(row)
+    counts, psychic, destiny, kua, name_number = calculate_numbers(name, day, month, year, gender)
+    completed_planes, incomplete_planes = check_planes(counts)
+    curr_year_num = year_number(day, month)
+    result = {
+        "id": record_id,
+        "name": name,
+        "day": day,
+        "month": month,
+        "year": year,
+        "gender": gender,
+        "counts": [counts[num] for num in range(1, 10)],
+        "psychic": psychic,
+        "destiny": destiny,
+        "kua": kua,
+        "name_number": name_number,
+        "curr_year_num": curr_year_num,
+        "completed_planes": completed_planes,
+        "incomplete_planes": incomplete_planes,
+    }
+    if with_reading:
+        args = (name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes)
+        model = LoShu_backend.sectioned_model_key() if sectioned else LoShu_backend.reading_model_key()
+        # Cached readings cost no LLM call, so only misses wait for the rate limiter; a sectioned
+        # reading makes one request per section.
+        if LoShu_backend.get_reading_cache().get(reading_fingerprint(model, *args)) is None:
+            limiter.acquire(len(SECTIONS) if sectioned else 1)
+        if sectioned:
+            result["reading"] = LoShu_backend.generate_interpretation_sectioned(*args)
+        else:
+            result["reading"] = LoShu_backend.generate_interpretation(*args)
+    return result
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, results):
+        for result in results:
+            self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes each flushed batch as its own part file inside the output directory.
+
+    Separate parts keep every flushed batch readable even if the run is killed, and let a
+    resumed run add rows without rewriting earlier files.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self._dir = path
+        self._run = time.strftime("%Y%m%d%H%M%S")
+        self._part = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, results):
+        table = self._pa.Table.from_pylist(results)
+        self._pq.write_table(table, os.path.join(self._dir, f"part-{self._run}-{self._part:05d}.parquet"))
+        self._part += 1
+
+    def close(self):
+        pass
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def run(input_path, output_path, input_format="auto", output_format="auto", concurrency=4, rate=30, with_reading=True, sectioned=False, flush_every=50):
+    """Streams records through the grid and reading pipeline, writing results incrementally.
+
+    At most `concurrency` records are in flight, so memory stays constant however large the
+    input. Returns (written, skipped, failed) counts.
+    """
+    if input_format == "auto":
+        input_format = "csv" if input_path.lower().endswith(".csv") else "jsonl"
+    if output_format == "auto":
+        output_format = "parquet" if output_path.lower().endswith(".parquet") else "jsonl"
+
+    checkpoint_path = f"{output_path}.checkpoint"
+    done = load_checkpoint(checkpoint_path)
+    writer = ParquetWriter(output_path) if output_format == "parquet" else JsonlWriter(output_path)
+    limiter = RateLimiter(rate)
+    written = skipped = failed = 0
+    pending_results = []
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, open(f"{output_path}.errors.jsonl", "a", encoding="utf-8") as errors:
+        def flush():
+            # Results reach the output before their ids reach the checkpoint, so a crash can
+            # only cause a record to be redone, never lost.
+            if pending_results:
+                writer.write(pending_results)
+                checkpoint.write("".join(f"{result['id']}\n" for result in pending_results))
+                checkpoint.flush()
+                pending_results.clear()
+
+        def collect(finished):
+            nonlocal written, failed
+            for future in finished:
+                record_id = in_flight.pop(future)
+                try:
+                    pending_results.append(future.result())
+                    written += 1
+                except Exception as e:
+                    errors.write(json.dumps({"id": record_id, "error": f"{type(e).__name__}: {e}"}) + "\n")
+                    errors.flush()
+                    failed += 1
+            if len(pending_results) >= flush_every:
+                flush()
+
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for record_id, row in read_records(input_path, input_format):
+                if record_id in done:
+                    skipped += 1
+                    continue
+                if len(in_flight) >= concurrency * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                future = pool.submit(process_record, record_id, row, with_reading, sectioned, limiter)
+                in_flight[future] = record_id
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+        flush()
+
+    writer.close()
+    return written, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute Lo Shu grids and readings for a file of people.")
+    parser.add_argument("input", help="CSV or JSONL file with name, gender and date of birth per record.")
+    parser.add_argument("output", help="JSONL file, or a .parquet directory of part files.")
+    parser.add_argument("--input-format", choices=["auto", "csv", "jsonl"], default="auto")
+    parser.add_argument("--output-format", choices=["auto", "jsonl", "parquet"], default="auto")
+    parser.add_argument("--concurrency", type=int, default=4, help="Records processed at once.")
+    parser.add_argument("--rate", type=float, default=30, help="Maximum LLM requests per minute (0 for no limit).")
+    parser.add_argument("--no-reading", action="store_true", help="Only compute grids; skip the LLM reading.")
+    parser.add_argument("--sectioned", action="store_true", help="Generate each reading as concurrent per-section requests.")
+    parser.add_argument("--flush-every", type=int, default=50, help="Results buffered before each write and checkpoint.")
+    args = parser.parse_args(argv)
+
+    written, skipped, failed = run(
+        args.input, args.output, args.input_format, args.output_format,
+        concurrency=args.concurrency, rate=args.rate, with_reading=not args.no_reading,
+        sectioned=args.sectioned, flush_every=args.flush_every,
+    )
+    print(f"Wrote {written} records, skipped {skipped} already done, {failed} failed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
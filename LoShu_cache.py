@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+
+
+# --- Reading Cache ---
+
+# Location of the on-disk cache; override with the LOSHU_CACHE_PATH environment variable.
+DEFAULT_CACHE_PATH = os.environ.get("LOSHU_CACHE_PATH", ".loshu_cache.sqlite3")
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+# Seconds between writes of memory-tier hits to the disk tier's access times.
+TOUCH_INTERVAL = 60
+
+
+def reading_fingerprint(model, name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes):
+    """Returns a stable hash of everything that shapes a reading's prompt, plus the model name."""
+    payload = {
+        "model": model,
+        "name": name,
+        "dob": [int(day), int(month), int(year)],
+        "gender": gender,
+        "psychic": int(psychic),
+        "destiny": int(destiny),
+        "kua": int(kua),
+        "name_number": int(name_number),
+        "curr_year_num": int(curr_year_num),
+        "counts": [int(counts.get(i, 0)) for i in range(1, 10)],
+        "completed_planes": list(completed_planes),
+        "incomplete_planes": list(incomplete_planes),
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ReadingCache:
+    """Two-tier cache of generated readings: an in-process LRU in front of a SQLite store.
+
+    Bodies are zlib-compressed on disk. Every entry is stamped with the calendar year it was
+    written in and expires when the year changes, since readings include a current-year section.
+    The disk tier is trimmed to `max_bytes` of compressed data, least recently used first. Hits
+    served from memory are written to the disk tier's access times in batches, at least every
+    TOUCH_INTERVAL seconds and always before trimming, so hot readings are not trimmed first.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MEMORY_ENTRIES, max_bytes=DEFAULT_DISK_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._touched = {}
+        self._touched_flushed = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS readings (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                year INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS readings_accessed ON readings (accessed_at)")
+        self.purge_expired()
+
+    def get(self, key):
+        """Returns the cached reading for `key`, or None on a miss."""
+        current_year = date.today().year
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                text, year = entry
+                if year == current_year:
+                    self._memory.move_to_end(key)
+                    self._touch(key)
+                    return text
+                del self._memory[key]
+
+            row = self._conn.execute("SELECT body, year FROM readings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            body, year = row
+            if year != current_year:
+                self._conn.execute("DELETE FROM readings WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE readings SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            text = zlib.decompress(body).decode("utf-8")
+            self._remember(key, text, year)
+            return text
+
+    def put(self, key, text):
+        """Stores a reading in both tiers and trims the disk tier back under its size budget."""
+        current_year = date.today().year
+        body = zlib.compress(text.encode("utf-8"), 6)
+        with self._lock:
+            self._remember(key, text, current_year)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO readings (key, body, size, year, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), current_year, time.time()),
+            )
+            self._evict()
+
+    def purge_expired(self):
+        """Drops every entry written in a previous year."""
+        current_year = date.today().year
+        with self._lock:
+            self._conn.execute("DELETE FROM readings WHERE year != ?", (current_year,))
+            for key in [k for k, (_, year) in self._memory.items() if year != current_year]:
+                del self._memory[key]
+                self._touched.pop(key, None)
+
+    def clear(self):
+        """Empties both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._conn.execute("DELETE FROM readings")
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.close()
+
+    def _touch(self, key):
+        self._touched[key] = time.time()
+        if time.monotonic() - self._touched_flushed >= TOUCH_INTERVAL:
+            self._flush_touched()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE readings SET accessed_at = ? WHERE key = ?", [(at, key) for key, at in self._touched.items()])
+            self._touched.clear()
+        self._touched_flushed = time.monotonic()
+
+    def _remember(self, key, text, year):
+        self._memory[key] = (text, year)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM readings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self._flush_touched()
+        for key, size in self._conn.execute("SELECT key, size FROM readings ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM readings WHERE key = ?", (key,))
+            total -= size
@@ -0,0 +1,89 @@
+from LoShu_core import ALL_PLANES_MASK, PLANE_COMPLETION, PLANE_NAME_SPLITS, calculate_numbers, presence_mask
+
+
+# --- Compact Chart Representation ---
+
+class Chart:
+    """A Lo Shu grid packed into nine count bytes plus a 9-bit presence mask.
+
+    Charts are immutable, hashable and compare by value, so they can be used as dict keys or
+    set members for deduplication. `to_bytes` gives a 9-byte form for storage; the mask is
+    derived from the counts. A Chart also answers `get`/`items` like the counts dict returned by
+    calculate_numbers, so it can be passed anywhere a counts dict is read.
+    """
+
+    __slots__ = ("counts", "mask")
+
+    def __init__(self, counts):
+        """Builds a chart from 9 count bytes (counts of the numbers 1-9 in order)."""
+        counts = bytes(counts)
+        if len(counts) != 9:
+            raise ValueError("A chart needs exactly 9 counts.")
+        object.__setattr__(self, "counts", counts)
+        object.__setattr__(self, "mask", presence_mask(self))
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Builds a chart from a {number: count} dict as returned by calculate_numbers."""
+        return cls(counts.get(num, 0) for num in range(1, 10))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data)
+
+    @classmethod
+    def calculate(cls, name, day, month, year, gender):
+        """Like calculate_numbers, but returns the grid as a Chart."""
+        counts, psychic, destiny, kua, name_number = calculate_numbers(name, day, month, year, gender)
+        return cls.from_counts(counts), psychic, destiny, kua, name_number
+
+    def to_bytes(self):
+        return self.counts
+
+    def to_counts(self):
+        """Returns the grid as a {number: count} dict."""
+        return {num: self.counts[num - 1] for num in range(1, 10)}
+
+    @property
+    def completed_mask(self):
+        """Bitmask of completed planes, in the order of LoShu_core.PLANES."""
+        return PLANE_COMPLETION[self.mask]
+
+    @property
+    def incomplete_mask(self):
+        return ALL_PLANES_MASK ^ PLANE_COMPLETION[self.mask]
+
+    def check_planes(self):
+        """Same result as check_planes on the counts dict, from a single table lookup."""
+        completed, incompleted = PLANE_NAME_SPLITS[PLANE_COMPLETION[self.mask]]
+        return list(completed), list(incompleted)
+
+    def missing(self):
+        """Numbers 1-9 absent from the grid."""
+        return [num for num in range(1, 10) if not self.mask >> (num - 1) & 1]
+
+    def get(self, num, default=0):
+        return self.counts[num - 1] if 1 <= num <= 9 else default
+
+    def __getitem__(self, num):
+        if not 1 <= num <= 9:
+            raise KeyError(num)
+        return self.counts[num - 1]
+
+    def items(self):
+        return ((num, self.counts[num - 1]) for num in range(1, 10))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Chart is immutable.")
+
+    def __eq__(self, other):
+        return isinstance(other, Chart) and self.counts == other.counts
+
+    def __hash__(self):
+        return hash(self.counts)
+
+    def __repr__(self):
+        return f"Chart({list(self.counts)})"
+
+    def __reduce__(self):
+        return (Chart, (self.counts,))
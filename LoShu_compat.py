@@ -0,0 +1,202 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from LoShu_batch import presence_masks
+from LoShu_core import PLANE_COMPLETION, PLANES, presence_mask
+
+
+# --- Group Compatibility ---
+#
+# Scores how well two people's charts fit together, for matching within teams and communities.
+# A score (0-100) adds up five parts, weighted by WEIGHTS:
+#   psychic, destiny  the friendship of the planets ruling each person's number
+#   kua               whether both Kua numbers are in the same Feng Shui group
+#   planes            the share of the pair's incomplete planes their combined grids complete
+#   squares           the share of each person's missing squares the other person has
+# The score depends only on (psychic, destiny, Kua group, presence mask), so people with equal
+# values form one class and groups are scored class against class.
+
+WEIGHTS = {"psychic": 25, "destiny": 25, "kua": 15, "planes": 20, "squares": 15}
+
+# Natural friends and enemies of the planet ruling each number (1 Sun, 2 Moon, 3 Jupiter,
+# 4 Rahu, 5 Mercury, 6 Venus, 7 Ketu, 8 Saturn, 9 Mars); all other pairs are neutral.
+PLANET_FRIENDS = {1: {2, 3, 9}, 2: {1, 5}, 3: {1, 2, 9}, 4: {5, 6, 8}, 5: {1, 6}, 6: {5, 8}, 7: {5, 6, 8}, 8: {5, 6}, 9: {1, 2, 3}}
+PLANET_ENEMIES = {1: {6, 8}, 2: set(), 3: {5, 6}, 4: {1, 2, 9}, 5: {2}, 6: {1, 2}, 7: {1, 2, 9}, 8: {1, 2, 9}, 9: {5}}
+# East group Kua numbers; all others, including 5, belong to the West group.
+EAST_KUA = {1, 3, 4, 9}
+
+
+def _relation(a, b):
+    if a == b:
+        return 1
+    return 1 if b in PLANET_FRIENDS[a] else -1 if b in PLANET_ENEMIES[a] else 0
+
+
+def _build_tables():
+    # Affinity of two numbers, from -1 (mutual enemies) to 1 (mutual friends), indexed by number.
+    affinity = np.zeros((10, 10), dtype=np.float32)
+    for a in range(1, 10):
+        for b in range(1, 10):
+            affinity[a, b] = (_relation(a, b) + _relation(b, a)) / 2
+    east = np.array([n in EAST_KUA for n in range(10)])
+
+    # Plane and square complementarity for every pair of presence masks.
+    masks = np.arange(512, dtype=np.uint16)
+    popcount = np.array([bin(n).count("1") for n in range(512)], dtype=np.float32)
+    completion = np.array(PLANE_COMPLETION, dtype=np.uint16)
+    a, b = masks[:, None], masks[None, :]
+    either = completion[a] | completion[b]
+    gained = popcount[completion[a | b] & ~either]
+    open_planes = len(PLANES) - popcount[either]
+    planes = np.where(open_planes > 0, gained / np.maximum(open_planes, 1), 1)
+    missing = 2 * 9 - popcount[a] - popcount[b]
+    filled = popcount[b & ~a] + popcount[a & ~b]
+    squares = np.where(missing > 0, filled / np.maximum(missing, 1), 1)
+    masks_score = WEIGHTS["planes"] * planes + WEIGHTS["squares"] * squares
+
+    # The number parts of the score for every pair of core ids (see _core_ids).
+    psychic, destiny, group = np.meshgrid(np.arange(1, 10), np.arange(1, 10), [False, True], indexing="ij")
+    psychic, destiny, group = psychic.ravel(), destiny.ravel(), group.ravel()
+    core_score = (
+        WEIGHTS["psychic"] * (affinity[psychic[:, None], psychic[None, :]] + 1) / 2
+        + WEIGHTS["destiny"] * (affinity[destiny[:, None], destiny[None, :]] + 1) / 2
+        + WEIGHTS["kua"] * (group[:, None] == group[None, :])
+    )
+    return affinity, east, masks_score.astype(np.float32), core_score.astype(np.float32)
+
+
+_AFFINITY, _EAST, _MASK_SCORES, _CORE_SCORES = _build_tables()
+
+
+def number_affinity(a, b):
+    """Vectorized friendship of the planets ruling numbers a and b, from -1 (enemies) to 1 (friends)."""
+    return _AFFINITY[np.asarray(a, dtype=np.intp), np.asarray(b, dtype=np.intp)]
+
+
+def _core_ids(psychic, destiny, east_kua):
+    """Index into _CORE_SCORES of each (psychic, destiny, Kua group)."""
+    return (psychic.astype(np.int64) - 1) * 18 + (destiny.astype(np.int64) - 1) * 2 + east_kua
+
+
+def compatibility(chart_a, chart_b):
+    """Scores two charts as returned by calculate_numbers, from 0 to 100."""
+    counts_a, psychic_a, destiny_a, kua_a, _ = chart_a
+    counts_b, psychic_b, destiny_b, kua_b, _ = chart_b
+    score = (
+        WEIGHTS["psychic"] * (_AFFINITY[psychic_a, psychic_b] + 1) / 2
+        + WEIGHTS["destiny"] * (_AFFINITY[destiny_a, destiny_b] + 1) / 2
+        + WEIGHTS["kua"] * (_EAST[kua_a] == _EAST[kua_b])
+        + _MASK_SCORES[presence_mask(counts_a), presence_mask(counts_b)]
+    )
+    return float(score)
+
+
+class ProfileClasses(NamedTuple):
+    """Distinct (psychic, destiny, Kua group, presence mask) profiles of a group and who has each."""
+    psychic: np.ndarray   # (C,) uint8
+    destiny: np.ndarray   # (C,) uint8
+    east_kua: np.ndarray  # (C,) bool, Kua number in the East group
+    masks: np.ndarray     # (C,) uint16
+    sizes: np.ndarray     # (C,) int64, people per class
+    inverse: np.ndarray   # (N,) int64, class of each person
+    members: np.ndarray   # (N,) int64, people ordered by class
+    starts: np.ndarray    # (C + 1,) int64, class c's people are members[starts[c]:starts[c + 1]]
+
+
+def profile_classes(batch):
+    """Groups the people of a ChartBatch into classes of equal score-relevant profiles.
+
+    Grid counts matter only through which squares are present, and Kua numbers only through
+    their group, so people who differ in nothing else share a class.
+    """
+    masks = presence_masks(batch.counts)
+    east_kua = _EAST[batch.kua].astype(np.uint32)
+    keys = (batch.psychic.astype(np.uint32) << 24) | (batch.destiny.astype(np.uint32) << 20) | (east_kua << 16) | masks
+    unique_keys, inverse, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel().astype(np.int64)
+    return ProfileClasses(
+        psychic=(unique_keys >> 24).astype(np.uint8),
+        destiny=(unique_keys >> 20 & 0xF).astype(np.uint8),
+        east_kua=(unique_keys >> 16 & 1).astype(bool),
+        masks=(unique_keys & 0xFFFF).astype(np.uint16),
+        sizes=sizes.astype(np.int64),
+        inverse=inverse,
+        members=np.argsort(inverse, kind="stable"),
+        starts=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+    )
+
+
+def class_scores(classes, rows=None):
+    """Scores classes `rows` (default all) against every class: a (len(rows), C) float32 matrix."""
+    rows = np.arange(len(classes.sizes)) if rows is None else np.asarray(rows)
+    core = _core_ids(classes.psychic, classes.destiny, classes.east_kua)
+    scores = np.take(_CORE_SCORES[core[rows]], core, axis=1)
+    scores += np.take(_MASK_SCORES[classes.masks[rows]], classes.masks, axis=1)
+    return scores
+
+
+def pairwise_scores(batch):
+    """Scores every pair in a ChartBatch: an (N, N) float32 matrix. Meant for small groups."""
+    classes = profile_classes(batch)
+    return class_scores(classes)[classes.inverse][:, classes.inverse]
+
+
+def _top_classes(classes, rows, k):
+    """For each class in `rows`, the k best-scoring classes (best first) and their scores."""
+    scores = class_scores(classes, rows)
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top, -top_scores))
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def _top_classes_shard(args):
+    return _top_classes(*args)
+
+
+def top_matches(batch, k=10, block_size=1024, processes=None):
+    """Finds each person's k best matches in a ChartBatch.
+
+    Returns (indices, scores), two (N, k) arrays with the best match first; ties go to the class
+    with the lower profile key. Slots beyond the group size hold -1 and NaN. Classes are scored
+    in blocks of `block_size` rows, on a pool of `processes` worker processes if given.
+    """
+    classes = profile_classes(batch)
+    n_classes = len(classes.sizes)
+    # k + 1 classes always hold k people besides the person being matched.
+    want = k + 1
+    blocks = [np.arange(start, min(start + block_size, n_classes)) for start in range(0, n_classes, block_size)]
+    if processes and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_top_classes_shard, [(classes, rows, want) for rows in blocks]))
+    else:
+        results = [_top_classes(classes, rows, want) for rows in blocks]
+    top = np.concatenate([result[0] for result in results])
+    top_scores = np.concatenate([result[1] for result in results])
+
+    n = len(classes.inverse)
+    indices = np.full((n, k), -1, dtype=np.int64)
+    scores = np.full((n, k), np.nan, dtype=np.float32)
+    for c in range(n_classes):
+        # The first k + 1 people of the best classes, then each member minus themselves.
+        candidates, candidate_scores, taken = [], [], 0
+        for other, score in zip(top[c], top_scores[c]):
+            people = classes.members[classes.starts[other]:classes.starts[other + 1]][:want - taken]
+            candidates.append(people)
+            candidate_scores.append(np.full(len(people), score, dtype=np.float32))
+            taken += len(people)
+            if taken == want:
+                break
+        candidates = np.concatenate(candidates)
+        candidate_scores = np.concatenate(candidate_scores)
+        people = classes.members[classes.starts[c]:classes.starts[c + 1]]
+        keep = candidates[None, :] != people[:, None]
+        # Stable sort moves each person's own slot, if any, to the end.
+        slots = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+        width = k if len(candidates) == want else min(k, len(candidates) - 1)
+        indices[people, :width] = candidates[slots[:, :width]]
+        scores[people, :width] = candidate_scores[slots[:, :width]]
+    return indices, scores
@@ -0,0 +1,129 @@
+from datetime import date
+
+
+# --- Core Numerology Functions ---
+#
+# Pure-Python chart calculations with no third-party imports, so batch workers, CLI jobs
+# and tests can use them without paying for Streamlit, LangChain or pandas.
+
+# Pythagorean numerology chart for name calculation
+NAME_CHART = {
+    'A': 1, 'J': 1, 'S': 1,
+    'B': 2, 'K': 2, 'T': 2,
+    'C': 3, 'L': 3, 'U': 3,
+    'D': 4, 'M': 4, 'V': 4,
+    'E': 5, 'N': 5, 'W': 5,
+    'F': 6, 'O': 6, 'X': 6,
+    'G': 7, 'P': 7, 'Y': 7,
+    'H': 8, 'Q': 8, 'Z': 8,
+    'I': 9, 'R': 9
+}
+
+def reduce_to_digit(n):
+    """Reduces a number to a single digit by summing its digits repeatedly."""
+    while n > 9:
+        n = sum(int(d) for d in str(n))
+    return n
+
+# Translation table turning each ASCII letter into the character with its value as code point,
+# and deleting every other ASCII character, so an ASCII name's letter sum is a byte sum.
+_NAME_TABLE = {code: None for code in range(128)}
+_NAME_TABLE.update({ord(letter): chr(value) for letter, value in NAME_CHART.items()})
+_NAME_TABLE.update({ord(letter.lower()): chr(value) for letter, value in NAME_CHART.items()})
+
+def calculate_name_number(name):
+    """Calculates the numerology number for a given name."""
+    if name.isascii():
+        name_sum = sum(name.translate(_NAME_TABLE).encode())
+    else:
+        name_sum = sum(NAME_CHART.get(char.upper(), 0) for char in name if char.isalpha())
+    return reduce_to_digit(name_sum)
+
+def calculate_numbers(name, day, month, year, gender):
+    """Calculates all the core numerological numbers and the counts for the grid."""
+    # Create the full date string to extract all digits.
+    date_str = f"{day:02d}{month:02d}{year}"
+    digits = [int(d) for d in date_str]
+
+    # Calculate Psychic, Destiny, and Year Sum numbers.
+    psychic = reduce_to_digit(day)
+    destiny = reduce_to_digit(sum(digits))
+    year_sum = reduce_to_digit(year)
+    name_number = calculate_name_number(name)
+
+    # Calculate Kua number based on gender.
+    kua = 0
+    if gender.lower() == "male":
+        kua = 11 - year_sum
+        if kua == 10:
+            kua = 1
+        if kua > 9:
+            kua = reduce_to_digit(kua)
+    else:  # female
+        kua = 4 + year_sum
+        if kua > 9:
+             kua = reduce_to_digit(kua)
+        
+
+    # IMPORTANT: The Name Number and Kua number are included in the list for the grid.
+    all_nums = [d for d in digits if d > 0] + [psychic, destiny, kua, name_number]
+    
+    # Count occurrences of each number from 1 to 9.
+    counts = {i: all_nums.count(i) for i in range(1, 10)}
+    
+    return counts, psychic, destiny, kua, name_number
+
+def personal_year(day, month, year):
+    """The personal year number for `year`: the digit sum of the birthday in that year, reduced.
+
+    A digit sum reduces to the same digit as the plain sum, so no digit string is needed.
+    """
+    return 1 + (day + month + year - 1) % 9
+
+def year_number(day, month, today=None):
+    """The personal year number for the current year, or for the year of `today` if given."""
+    return personal_year(day, month, (today or date.today()).year)
+
+# Horizontal, vertical, and diagonal planes of the grid, in display order.
+PLANES = {
+    "Mental Plane (4-9-2)": [4, 9, 2],
+    "Emotional Plane (3-5-7)": [3, 5, 7],
+    "Practical Plane (8-1-6)": [8, 1, 6],
+    "Thought Plane (4-3-8)": [4, 3, 8],
+    "Will Plane (9-5-1)": [9, 5, 1],
+    "Action Plane (2-7-6)": [2, 7, 6],
+    "Determination Plane (4-5-6)": [4, 5, 6],
+    "Compassion Plane (2-5-8)": [2, 5, 8]
+}
+
+# Each plane as a 9-bit mask over the numbers 1-9 (bit 0 is number 1).
+PLANE_MASKS = [sum(1 << (num - 1) for num in numbers) for numbers in PLANES.values()]
+ALL_PLANES_MASK = (1 << len(PLANES)) - 1
+
+# Completed-plane bitmask (bit i is the i-th entry of PLANES) for every possible presence mask.
+PLANE_COMPLETION = tuple(
+    sum(1 << i for i, plane in enumerate(PLANE_MASKS) if mask & plane == plane)
+    for mask in range(1 << 9)
+)
+
+# Completed and incomplete plane names for every completed-plane bitmask.
+PLANE_NAME_SPLITS = tuple(
+    (
+        tuple(name for i, name in enumerate(PLANES) if completed >> i & 1),
+        tuple(name for i, name in enumerate(PLANES) if not completed >> i & 1),
+    )
+    for completed in range(ALL_PLANES_MASK + 1)
+)
+
+def presence_mask(counts):
+    """Packs which of the numbers 1-9 appear in a chart into a 9-bit mask."""
+    mask = 0
+    for num in range(1, 10):
+        if counts.get(num, 0) > 0:
+            mask |= 1 << (num - 1)
+    return mask
+
+def check_planes(counts):
+    """Checks for completed horizontal, vertical, and diagonal planes."""
+    completed, incompleted = PLANE_NAME_SPLITS[PLANE_COMPLETION[presence_mask(counts)]]
+    return list(completed), list(incompleted)
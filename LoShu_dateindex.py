@@ -0,0 +1,248 @@
+import argparse
+import os
+import struct
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from LoShu_batch import PLANE_NAMES, check_planes_batch
+from LoShu_table import DEFAULT_TABLE_PATH, ChartTable
+
+
+# --- Date Search Index ---
+#
+# Usage: python LoShu_dateindex.py            (after building the chart table with LoShu_table.py)
+#
+#     index = open_date_index()
+#     query = Plane("Compassion Plane (2-5-8)") & Gender("Female")
+#     for day, gender in index.dates(query, date(1980, 1, 1), date(2000, 12, 31)): ...
+#     index.count(Destiny(8) & Missing(5))
+#
+# The inverse of calculate_numbers: which birth dates give a chart with some property. Each
+# property (a square's count, a plane's completion, a core number, the gender) has a bitmap
+# over every (date, gender) row of the chart table, packed eight rows per byte, so a boolean
+# query is a few bitwise operations on arrays of a few kilobytes. Like the chart table, the
+# index describes the date-derived chart; pass `name_number` to a query to include a name.
+
+# Location of the index file; override with the LOSHU_DATE_INDEX_PATH environment variable.
+DEFAULT_DATE_INDEX_PATH = os.environ.get("LOSHU_DATE_INDEX_PATH", "loshu_dates.bmx")
+
+# File layout: a 20-byte header (magic, first date ordinal, number of dates, highest square
+# count) followed by one packed bitmap per key of _bitmap_keys, in that order. Row r of a
+# bitmap is bit r % 8 of byte r // 8, and row r is date r // 2 with gender r % 2 (0 = male).
+_MAGIC = b"LOSHUBX1"
+_HEADER = struct.Struct("<8siii")
+_GENDERS = ("Male", "Female")
+_POPCOUNT = np.array([bin(n).count("1") for n in range(256)], dtype=np.uint8)
+
+
+def _bitmap_keys(max_count):
+    keys = [("gender", g) for g in range(2)]
+    keys += [("count", number, count) for number in range(1, 10) for count in range(max_count + 1)]
+    keys += [("plane", p) for p in range(len(PLANE_NAMES))]
+    keys += [(field, value) for field in ("psychic", "destiny", "kua") for value in range(1, 10)]
+    return keys
+
+
+def build_date_index(table_path=DEFAULT_TABLE_PATH, path=DEFAULT_DATE_INDEX_PATH):
+    """Builds the bitmap index from the chart table at `table_path`. Returns the path written."""
+    table = ChartTable(table_path)
+    rows = np.asarray(table.rows()).reshape(-1, 12)
+    counts = rows[:, :9]
+    max_count = int(counts.max())
+    planes = check_planes_batch(counts)
+    columns = {
+        "gender": np.tile(np.arange(2), table.n_dates),
+        "psychic": rows[:, 9],
+        "destiny": rows[:, 10],
+        "kua": rows[:, 11],
+    }
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, table.start.toordinal(), table.n_dates, max_count))
+        for key in _bitmap_keys(max_count):
+            if key[0] == "count":
+                selected = counts[:, key[1] - 1] == key[2]
+            elif key[0] == "plane":
+                selected = planes[:, key[1]]
+            else:
+                selected = columns[key[0]] == key[1]
+            f.write(np.packbits(selected, bitorder="little").tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+class DateIndex:
+    """Read-only, memory-mapped view of an index written by build_date_index."""
+
+    def __init__(self, path=DEFAULT_DATE_INDEX_PATH):
+        with open(path, "rb") as f:
+            magic, start_ordinal, n_dates, max_count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a Lo Shu date index.")
+        self.path = path
+        self.start = date.fromordinal(start_ordinal)
+        self.n_dates = n_dates
+        self.n_rows = 2 * n_dates
+        self.max_count = max_count
+        self.n_bytes = (self.n_rows + 7) // 8
+        keys = _bitmap_keys(max_count)
+        self._rows = {key: i for i, key in enumerate(keys)}
+        self._bitmaps = np.memmap(path, dtype=np.uint8, mode="r", offset=_HEADER.size, shape=(len(keys), self.n_bytes))
+
+    def bitmap(self, key):
+        """The packed bitmap of one key, or an empty one for a value that never occurs."""
+        row = self._rows.get(key)
+        if row is None:
+            return np.zeros(self.n_bytes, dtype=np.uint8)
+        return np.asarray(self._bitmaps[row])
+
+    @property
+    def end(self):
+        """The last indexed date."""
+        return self.start + timedelta(days=self.n_dates - 1)
+
+    def _row_range(self, start, end):
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        if start > end:
+            raise ValueError(f"The range starts on {start}, after it ends on {end}.")
+        if start < self.start or end > self.end:
+            raise ValueError(
+                f"{start} to {end} is outside the indexed dates {self.start} to {self.end}; "
+                "rebuild the chart table with a wider --start-year/--end-year."
+            )
+        return 2 * (start - self.start).days, 2 * ((end - self.start).days + 1)
+
+    def count(self, predicate, start=None, end=None, name_number=0):
+        """How many (date, gender) rows from `start` to `end` (inclusive) match.
+
+        Raises ValueError if the range reaches outside the indexed dates or starts after it ends.
+        """
+        lo, hi = self._row_range(start, end)
+        bits = predicate.evaluate(self, name_number)[lo // 8:(hi + 7) // 8].copy()
+        # Clear the rows outside the range that share the first and last bytes with it.
+        bits[0] &= (0xFF << lo % 8) & 0xFF
+        if hi % 8:
+            bits[-1] &= (1 << hi % 8) - 1
+        return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+    def dates(self, predicate, start=None, end=None, name_number=0):
+        """Iterates over the matching (date, gender) pairs from `start` to `end` (inclusive), in date order.
+
+        Raises ValueError, on the call rather than on iteration, if the range reaches outside the
+        indexed dates or starts after it ends.
+        """
+        lo, hi = self._row_range(start, end)
+        return self._dates(predicate.evaluate(self, name_number), lo, hi)
+
+    def _dates(self, bits, lo, hi):
+        first_byte = lo // 8
+        for byte in (np.flatnonzero(bits[first_byte:(hi + 7) // 8]) + first_byte).tolist():
+            value = int(bits[byte])
+            for bit in range(8):
+                row = byte * 8 + bit
+                if value >> bit & 1 and lo <= row < hi:
+                    yield self.start + timedelta(days=row // 2), _GENDERS[row % 2]
+
+
+class Predicate:
+    """A condition on a (date, gender) chart; combine with &, | and ~."""
+
+    def __init__(self, evaluate, label):
+        self._evaluate = evaluate
+        self.label = label
+
+    def evaluate(self, index, name_number=0):
+        """The packed bitmap of rows matching this condition."""
+        return self._evaluate(index, name_number)
+
+    def __and__(self, other):
+        return Predicate(lambda index, name_number: self.evaluate(index, name_number) & other.evaluate(index, name_number), f"({self.label} & {other.label})")
+
+    def __or__(self, other):
+        return Predicate(lambda index, name_number: self.evaluate(index, name_number) | other.evaluate(index, name_number), f"({self.label} | {other.label})")
+
+    def __invert__(self):
+        return Predicate(lambda index, name_number: ~self.evaluate(index, name_number), f"~{self.label}")
+
+    def __repr__(self):
+        return f"Predicate({self.label})"
+
+
+def _count_between(index, name_number, number, min_count, max_count):
+    # A name number adds one to its square, so the date-only count must be one lower.
+    shift = 1 if name_number == number else 0
+    max_count = index.max_count + shift if max_count is None else max_count
+    bitmap = np.zeros(index.n_bytes, dtype=np.uint8)
+    for count in range(max(min_count - shift, 0), max_count - shift + 1):
+        bitmap |= index.bitmap(("count", number, count))
+    return bitmap
+
+
+def Square(number, min_count=1, max_count=None):
+    """Number `number` appears between `min_count` and `max_count` (no limit if None) times."""
+    label = f"Square({number}, {min_count}, {max_count})"
+    return Predicate(lambda index, name_number: _count_between(index, name_number, number, min_count, max_count), label)
+
+
+def Missing(number):
+    """Number `number` does not appear in the grid."""
+    return Square(number, 0, 0)
+
+
+def Plane(name, complete=True):
+    """A plane, by its full name or first word ("Compassion"), is complete (or incomplete)."""
+    matches = [i for i, plane in enumerate(PLANE_NAMES) if plane == name or plane.split()[0] == name]
+    if not matches:
+        raise ValueError(f"Unknown plane {name!r}; expected one of {', '.join(PLANE_NAMES)}.")
+    plane = matches[0]
+    numbers = [int(n) for n in PLANE_NAMES[plane].split("(")[1].rstrip(")").split("-")]
+
+    def evaluate(index, name_number):
+        bitmap = index.bitmap(("plane", plane))
+        if name_number in numbers:
+            # The name number can complete a plane whose other two squares are present.
+            others = [_count_between(index, 0, n, 1, None) for n in numbers if n != name_number]
+            bitmap = bitmap | (others[0] & others[1])
+        return bitmap if complete else ~bitmap
+
+    return Predicate(evaluate, f"Plane({PLANE_NAMES[plane]!r}, complete={complete})")
+
+
+def Gender(gender):
+    value = 0 if gender.lower() == "male" else 1
+    return Predicate(lambda index, name_number: index.bitmap(("gender", value)), f"Gender({_GENDERS[value]!r})")
+
+
+def _core(field, value):
+    return Predicate(lambda index, name_number: index.bitmap((field, value)), f"{field.title()}({value})")
+
+
+def Psychic(value):
+    return _core("psychic", value)
+
+
+def Destiny(value):
+    return _core("destiny", value)
+
+
+def Kua(value):
+    return _core("kua", value)
+
+
+@lru_cache(maxsize=None)
+def open_date_index(path=DEFAULT_DATE_INDEX_PATH):
+    """Returns a shared DateIndex for `path`, mapping the file once per process."""
+    return DateIndex(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Lo Shu date search index from the chart table.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_DATE_INDEX_PATH)
+    parser.add_argument("--table", default=DEFAULT_TABLE_PATH, help="Chart table built by LoShu_table.py.")
+    args = parser.parse_args()
+    written = build_date_index(args.table, args.path)
+    print(f"Wrote {written}")
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from LoShu_dateindex import DateIndex, Destiny, Gender, Missing, Psychic, Square, build_date_index
+from LoShu_table import ChartTable, build_chart_table
+
+
+# --- Date Index Checks ---
+#
+# Usage: python LoShu_dateindex_check.py
+#
+# Builds a small chart table and date index in a temporary directory, compares queries over
+# ranges of every shape with a row-by-row scan of the chart table, and checks that ranges
+# reaching past either end of the index, lying wholly outside it, or running backwards raise
+# ValueError instead of quietly matching nothing. Exits non-zero on failure.
+
+FIRST, LAST = date(2000, 1, 1), date(2003, 12, 31)
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def brute_force(table, test, start, end):
+    """The (date, gender) pairs from `start` to `end` whose table row passes `test`."""
+    rows = table.rows()
+    matches = []
+    for offset in range((start - table.start).days, (end - table.start).days + 1):
+        for gender, name in enumerate(("Male", "Female")):
+            if test(rows[offset, gender], name):
+                matches.append((table.start + timedelta(days=offset), name))
+    return matches
+
+
+def check_in_range(index, table):
+    queries = {
+        "Destiny(8) & Missing(5)": (Destiny(8) & Missing(5), lambda row, g: row[10] == 8 and row[4] == 0),
+        "Psychic(1) | Square(9, 3)": (Psychic(1) | Square(9, 3), lambda row, g: row[9] == 1 or row[8] >= 3),
+        "~Gender('Male')": (~Gender("Male"), lambda row, g: g == "Female"),
+    }
+    ranges = [(None, None), (FIRST, FIRST), (LAST, LAST), (date(2001, 3, 7), date(2002, 11, 20)), (None, date(2000, 1, 9)), (date(2003, 12, 25), None)]
+    for label, (query, test) in queries.items():
+        for start, end in ranges:
+            expected = brute_force(table, test, start or FIRST, end or LAST)
+            expect(list(index.dates(query, start, end)) == expected, f"dates({label}, {start}, {end}) differs from a scan of the table")
+            expect(index.count(query, start, end) == len(expected), f"count({label}, {start}, {end}) differs from a scan of the table")
+
+
+def check_out_of_range(index, table):
+    ranges = {
+        "straddles the start": (date(1999, 12, 31), date(2000, 6, 1)),
+        "straddles the end": (date(2003, 6, 1), date(2004, 1, 1)),
+        "wholly before, open start": (None, date(1999, 1, 1)),
+        "wholly after, open end": (date(2200, 1, 1), None),
+        "wholly before": (date(1990, 1, 1), date(1990, 12, 31)),
+        "wholly after": (date(2010, 1, 1), date(2010, 12, 31)),
+        "backwards": (date(2002, 1, 2), date(2002, 1, 1)),
+    }
+    for label, (start, end) in ranges.items():
+        for method in (index.count, index.dates):
+            try:
+                method(Gender("Male"), start, end)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"{method.__name__}({start}, {end}) ({label}) did not raise ValueError")
+
+
+CHECKS = {
+    "in_range": check_in_range,
+    "out_of_range": check_out_of_range,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check DateIndex queries against the chart table.")
+    parser.add_argument("checks", nargs="*", help=f"Checks to run (default: all): {', '.join(CHECKS)}.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory:
+        table_path = build_chart_table(os.path.join(directory, "table.bin"), FIRST, LAST)
+        index = DateIndex(build_date_index(table_path, os.path.join(directory, "dates.bmx")))
+        table = ChartTable(table_path)
+        for name in args.checks or CHECKS:
+            started = time.perf_counter()
+            try:
+                CHECKS[name](index, table)
+            except AssertionError as e:
+                failed += 1
+                print(f"FAIL {name}: {e}")
+            else:
+                print(f"ok   {name} ({time.perf_counter() - started:.2f}s)")
+        del index, table
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
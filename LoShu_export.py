@@ -0,0 +1,348 @@
+import argparse
+import io
+import json
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+
+from LoShu_core import calculate_numbers, check_planes, year_number
+from LoShu_render import GRID_LAYOUT, core_numbers, grid_pattern, markdown_blocks, render_report_html, report_counts, report_dob
+
+
+# --- Report Export ---
+#
+# Usage: python LoShu_export.py readings.jsonl reports/ --format pdf --processes 8
+#
+# Renders reports (see LoShu_render) to standalone HTML, PNG or PDF files. The input is the
+# JSONL that LoShu_bulk writes, or any CSV/JSONL of people that LoShu_bulk reads; records without
+# a computed chart get one here. Reports are rendered on a pool of worker processes that each
+# write their file straight to disk, with only a bounded number in flight, so a run over many
+# thousands of records keeps neither the records nor the rendered files in memory.
+
+FORMATS = ("html", "png", "pdf")
+
+# Page geometry in pixels: A4 at 150 dpi for PDF pages, and the width of a PNG report.
+PAGE_WIDTH, PAGE_HEIGHT = 1240, 1754
+MARGIN = 90
+PDF_RESOLUTION = 150
+
+COLORS = {
+    "background": "#ffffff",
+    "heading": "#1e3a8a",
+    "text": "#1f2937",
+    "muted": "#6b7280",
+    "complete": "#0c854e",
+    "incomplete": "#dd2c00",
+    "cell": "#f8f9fa",
+    "cell_border": "#e9ecef",
+    "cell_text": "#ced4da",
+    "present": "#e6f9f1",
+    "present_border": "#a3e9d1",
+    "multiple": "#d1f3e3",
+    "multiple_border": "#77d9b4",
+    "multiple_text": "#0a6b3e",
+}
+FONT_SIZES = {"title": 44, "h1": 34, "h2": 30, "h3": 25, "text": 21, "cell": 56, "badge": 22}
+LINE_SPACING = 1.4
+CELL_SIZE, CELL_GAP = 140, 14
+
+# A Unicode TrueType font for PNG and PDF reports: LOSHU_REPORT_FONT if set, otherwise the first
+# of REPORT_FONT_CANDIDATES that exists. Names, readings and the report's own marks (— ✓ ✗ •) need
+# real glyphs, so there is no fallback to Pillow's bitmap font. DejaVu Sans covers Latin, Greek and
+# Cyrillic; point LOSHU_REPORT_FONT at a Noto font for the script of names in other scripts.
+REPORT_FONT_PATH = os.environ.get("LOSHU_REPORT_FONT")
+REPORT_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu-sans-fonts/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/google-noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+
+# --- Report Data ---
+
+def report_from_profile(name, day, month, year, gender, reading=None, today=None):
+    """Computes the chart for a profile and returns it as a report dict."""
+    counts, psychic, destiny, kua, name_number = calculate_numbers(name, day, month, year, gender)
+    completed_planes, incomplete_planes = check_planes(counts)
+    report = {
+        "name": name,
+        "day": day,
+        "month": month,
+        "year": year,
+        "gender": gender,
+        "counts": [counts[num] for num in range(1, 10)],
+        "psychic": psychic,
+        "destiny": destiny,
+        "kua": kua,
+        "name_number": name_number,
+        "curr_year_num": year_number(day, month, today),
+        "completed_planes": completed_planes,
+        "incomplete_planes": incomplete_planes,
+    }
+    if reading:
+        report["reading"] = reading
+    return report
+
+
+# --- Image Rendering ---
+
+@lru_cache(maxsize=None)
+def report_font_path():
+    """The TrueType font reports are drawn with; raises RuntimeError if there is none."""
+    if REPORT_FONT_PATH:
+        if not os.path.isfile(REPORT_FONT_PATH):
+            raise RuntimeError(f"LOSHU_REPORT_FONT is set to {REPORT_FONT_PATH!r}, which is not a file.")
+        return REPORT_FONT_PATH
+    for path in REPORT_FONT_CANDIDATES:
+        if os.path.isfile(path):
+            return path
+    raise RuntimeError(
+        "No Unicode TrueType font found for PNG/PDF reports. Install DejaVu Sans or Noto Sans "
+        "(e.g. the fonts-dejavu-core package) or set LOSHU_REPORT_FONT to a .ttf file."
+    )
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    from PIL import ImageFont
+    return ImageFont.truetype(report_font_path(), size)
+
+
+@lru_cache(maxsize=1024)
+def _grid_image(pattern):
+    """The grid for one counts pattern as an image, drawn once per pattern."""
+    from PIL import Image, ImageDraw
+    side = 3 * CELL_SIZE + 2 * CELL_GAP
+    image = Image.new("RGB", (side, side), COLORS["background"])
+    draw = ImageDraw.Draw(image)
+    for r, row in enumerate(GRID_LAYOUT):
+        for c, num in enumerate(row):
+            count = pattern[num - 1]
+            x, y = c * (CELL_SIZE + CELL_GAP), r * (CELL_SIZE + CELL_GAP)
+            center_x, center_y = x + CELL_SIZE // 2, y + CELL_SIZE // 2
+            if count == 0:
+                draw.rounded_rectangle((x, y, x + CELL_SIZE - 1, y + CELL_SIZE - 1), radius=14, fill=COLORS["cell"], outline=COLORS["cell_border"], width=3)
+                draw.text((center_x, center_y), "—", font=_font(FONT_SIZES["cell"]), fill=COLORS["cell_text"], anchor="mm")
+                continue
+            if count == 1:
+                fill, border, color = COLORS["present"], COLORS["present_border"], COLORS["complete"]
+            else:
+                fill, border, color = COLORS["multiple"], COLORS["multiple_border"], COLORS["multiple_text"]
+            draw.rounded_rectangle((x, y, x + CELL_SIZE - 1, y + CELL_SIZE - 1), radius=14, fill=fill, outline=border, width=3)
+            draw.text((center_x, center_y), str(num), font=_font(FONT_SIZES["cell"]), fill=color, anchor="mm")
+            if count > 1:
+                draw.text((x + CELL_SIZE - 22, y + 24), str(count), font=_font(FONT_SIZES["badge"]), fill=COLORS["incomplete"], anchor="mm")
+    return image
+
+
+def _wrap(text, font, width):
+    """Greedy word wrap of one paragraph to lines no wider than `width` pixels."""
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and font.getlength(candidate) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _text_rows(text, style, color, indent=0, marker=None, space_before=0):
+    """Layout rows for one paragraph: a (height, paint(image, draw, y)) pair per wrapped line.
+
+    A `marker` ("•", "✓", ...) is set in the indent before the first line.
+    """
+    font = _font(FONT_SIZES[style])
+    height = int(FONT_SIZES[style] * LINE_SPACING)
+    rows = []
+    for i, line in enumerate(_wrap(text, font, PAGE_WIDTH - 2 * MARGIN - indent)):
+        offset = space_before if i == 0 else 0
+
+        def paint(image, draw, y, line=line, offset=offset, marker=marker if i == 0 else None):
+            if marker:
+                draw.text((MARGIN + indent - 8, y + offset), marker, font=font, fill=color, anchor="ra")
+            draw.text((MARGIN + indent, y + offset), line, font=font, fill=color)
+
+        rows.append((height + offset, paint))
+    return rows
+
+
+def _layout(report):
+    """The whole report as layout rows, top to bottom."""
+    rows = _text_rows("Lo Shu Grid Numerology Report", "title", COLORS["heading"])
+    rows += _text_rows(f"{report['name']}  ·  {report_dob(report)}  ·  {report['gender']}", "text", COLORS["muted"], space_before=6)
+
+    rows += _text_rows("Your Core Numbers", "h1", COLORS["heading"], space_before=30)
+    rows += _text_rows(" · ".join(f"{label}: {value}" for label, value in core_numbers(report)), "text", COLORS["text"])
+
+    rows += _text_rows("Your Lo Shu Grid", "h1", COLORS["heading"], space_before=30)
+    grid = _grid_image(grid_pattern(report_counts(report)))
+    rows.append((grid.height + 20, lambda image, draw, y: image.paste(grid, ((PAGE_WIDTH - grid.width) // 2, y + 10))))
+
+    rows += _text_rows("Planes Analysis", "h1", COLORS["heading"], space_before=30)
+    for plane in report["completed_planes"]:
+        rows += _text_rows(plane, "text", COLORS["complete"], indent=30, marker="✓")
+    for plane in report["incomplete_planes"]:
+        rows += _text_rows(plane, "text", COLORS["incomplete"], indent=30, marker="✗")
+
+    if report.get("reading"):
+        rows += _text_rows("Your Detailed Numerology Reading", "h1", COLORS["heading"], space_before=30)
+        for kind, text in markdown_blocks(report["reading"]):
+            if kind == "item":
+                rows += _text_rows(text, "text", COLORS["text"], indent=30, marker="•")
+            elif kind == "paragraph":
+                rows += _text_rows(text, "text", COLORS["text"], space_before=8)
+            else:
+                rows += _text_rows(text, "h2" if kind in ("h1", "h2") else "h3", COLORS["heading"], space_before=20)
+    return rows
+
+
+def _paint(rows, height):
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (PAGE_WIDTH, height), COLORS["background"])
+    draw = ImageDraw.Draw(image)
+    y = MARGIN
+    for row_height, paint in rows:
+        paint(image, draw, y)
+        y += row_height
+    return image
+
+
+def render_report_png(report):
+    """Renders a report as one tall PNG image and returns its bytes."""
+    rows = _layout(report)
+    image = _paint(rows, 2 * MARGIN + sum(height for height, _ in rows))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=False)
+    return buffer.getvalue()
+
+
+def render_report_pdf(report):
+    """Renders a report as A4 PDF pages and returns the PDF bytes."""
+    pages, page, used = [], [], 0
+    for row in _layout(report):
+        if page and used + row[0] > PAGE_HEIGHT - 2 * MARGIN:
+            pages.append(page)
+            page, used = [], 0
+        page.append(row)
+        used += row[0]
+    pages.append(page)
+    images = [_paint(rows, PAGE_HEIGHT) for rows in pages]
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", resolution=PDF_RESOLUTION, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    "html": lambda report: render_report_html(report).encode("utf-8"),
+    "png": render_report_png,
+    "pdf": render_report_pdf,
+}
+
+
+def export_report(report, path, fmt=None):
+    """Writes one report to `path`, in `fmt` or the format named by the file extension."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unknown report format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    data = RENDERERS[fmt](report)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+# --- Batch Export ---
+
+def report_filename(record_id, fmt):
+    return re.sub(r"[^\w.-]", "_", str(record_id)) + "." + fmt
+
+
+def _report_from_record(row):
+    if "counts" in row and "psychic" in row:
+        return row
+    from LoShu_bulk import parse_record
+    return report_from_profile(*parse_record(row), reading=row.get("reading"))
+
+
+def _export_record(record_id, row, path, fmt):
+    # Runs in a worker process; only the path goes back to the parent.
+    export_report(_report_from_record(row), path, fmt)
+    return path
+
+
+def export_batch(records, out_dir, fmt="pdf", processes=None, max_pending=None):
+    """Exports (record_id, record) pairs to `out_dir`, one file per record.
+
+    Records are pulled from the iterable only as workers free up, and reports whose file already
+    exists are skipped, so an interrupted run resumes where it stopped. Failures are appended to
+    errors.jsonl in `out_dir`. Returns (written, skipped, failed).
+    """
+    if fmt != "html":
+        # Without a font every record would fail; stop before starting the pool.
+        report_font_path()
+    os.makedirs(out_dir, exist_ok=True)
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 4 * processes
+    written = skipped = failed = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool, open(os.path.join(out_dir, "errors.jsonl"), "a", encoding="utf-8") as errors:
+        pending = {}
+
+        def collect(done):
+            nonlocal written, failed
+            for future in done:
+                record_id = pending.pop(future)
+                try:
+                    future.result()
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    errors.write(json.dumps({"id": record_id, "error": f"{type(e).__name__}: {e}"}) + "\n")
+                    errors.flush()
+
+        for record_id, row in records:
+            path = os.path.join(out_dir, report_filename(record_id, fmt))
+            if os.path.exists(path):
+                skipped += 1
+                continue
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(_export_record, record_id, row, path, fmt)] = record_id
+        collect(wait(pending).done)
+    return written, skipped, failed
+
+
+def main(argv=None):
+    from LoShu_bulk import read_records
+    parser = argparse.ArgumentParser(description="Export Lo Shu reports as HTML, PNG or PDF files.")
+    parser.add_argument("input", help="JSONL from LoShu_bulk, or a CSV/JSONL of people.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=FORMATS, default="pdf")
+    parser.add_argument("--input-format", choices=["auto", "csv", "jsonl"], default="auto")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per CPU).")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format
+    if input_format == "auto":
+        input_format = "csv" if args.input.lower().endswith(".csv") else "jsonl"
+    written, skipped, failed = export_batch(read_records(args.input, input_format), args.out_dir, args.format, args.processes)
+    print(f"Wrote {written} reports, skipped {skipped} already exported, {failed} failed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
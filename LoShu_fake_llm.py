@@ -0,0 +1,206 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# --- Local Groq-Compatible Stand-In ---
+#
+# Usage: python LoShu_fake_llm.py --port 8787 --latency 0.5 --tokens-per-sec 200
+#        GROQ_API_BASE=http://127.0.0.1:8787 GROQ_API_KEY=fake streamlit run frontend.py
+#
+# Answers OpenAI/Groq-style chat-completion requests, streamed or not, with a canned reading.
+# Latency, token rate and injected failures are configurable, so the app can be load-tested
+# offline without spending real quota.
+
+CANNED_SECTIONS = [
+    "## 1. Individual Squares Analysis",
+    "## 2. Plane Significance",
+    "## 3. Core Number Analysis",
+    "## 4. Life Domains",
+    "## 5. Current Year Analysis",
+    "## 6. Holistic Synthesis",
+    "## 7. Action Plan & Affirmations",
+    "## 8. Final Wisdom",
+]
+CANNED_SENTENCE = "Your numbers show a steady balance between thought and action, and this year rewards patient effort."
+
+
+def canned_reading(tokens):
+    """Builds a markdown reading of roughly `tokens` words spread over the eight sections."""
+    words = CANNED_SENTENCE.split()
+    per_section = max(tokens // len(CANNED_SECTIONS), 1)
+    sections = []
+    for heading in CANNED_SECTIONS:
+        body = " ".join(words[i % len(words)] for i in range(per_section))
+        sections.append(f"{heading}\n{body}")
+    return "\n\n".join(sections)
+
+
+class FakeLLMConfig:
+    """Server behaviour, shared by all request handler threads."""
+
+    def __init__(self, latency=0.5, tokens_per_sec=200.0, reading_tokens=3000, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.reading_tokens = reading_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.reading = canned_reading(reading_tokens)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def roll(self):
+        """Picks this request's outcome: None for success, or an HTTP error status."""
+        with self.lock:
+            self.requests += 1
+            value = self.random.random()
+        if value < self.rate_limit_rate:
+            return 429
+        if value < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = FakeLLMConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+
+        status = self.config.roll()
+        time.sleep(self.config.latency)
+        if status == 429:
+            return self._send_json(429, {"error": {"message": "Rate limit reached (injected).", "type": "rate_limit_exceeded"}}, {"Retry-After": "1"})
+        if status:
+            return self._send_json(status, {"error": {"message": "Internal error (injected).", "type": "internal_server_error"}})
+
+        model = body.get("model", "fake")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        if body.get("stream"):
+            self._stream(model, prompt_tokens)
+        else:
+            self._complete(model, prompt_tokens)
+
+    def _usage(self, prompt_tokens):
+        completion_tokens = self.config.reading_tokens
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def _complete(self, model, prompt_tokens):
+        words = self.config.reading.split(" ")
+        if self.config.tokens_per_sec:
+            time.sleep(len(words) / self.config.tokens_per_sec)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.config.reading}, "finish_reason": "stop"}],
+            "usage": self._usage(prompt_tokens),
+        })
+
+    def _stream(self, model, prompt_tokens):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send(delta, finish_reason=None, extra=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        delay = 1 / self.config.tokens_per_sec if self.config.tokens_per_sec else 0
+        try:
+            send({"role": "assistant", "content": ""})
+            for i, word in enumerate(self.config.reading.split(" ")):
+                send({"content": word if i == 0 else " " + word})
+                if delay:
+                    time.sleep(delay)
+            send({}, "stop", {"x_groq": {"id": completion_id, "usage": self._usage(prompt_tokens)}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections are routine under load.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(host="127.0.0.1", port=0, config=None):
+    """Creates a fake server with its own config; port 0 picks a free port."""
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {"config": config or FakeLLMConfig()})
+    server = FakeLLMServer((host, port), handler)
+    return server
+
+
+def start_server(host="127.0.0.1", port=0, config=None):
+    """Starts a fake server on a background thread and returns it.
+
+    The endpoint to use as GROQ_API_BASE is f"http://{host}:{server.server_port}".
+    """
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve canned readings from a local Groq-compatible endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-sec", type=float, default=200, help="Streaming rate (0 for no delay).")
+    parser.add_argument("--reading-tokens", type=int, default=3000, help="Approximate length of the canned reading.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429.")
+    parser.add_argument("--seed", type=int, help="Seed for the error injection.")
+    args = parser.parse_args(argv)
+
+    config = FakeLLMConfig(args.latency, args.tokens_per_sec, args.reading_tokens, args.error_rate, args.rate_limit_rate, args.seed)
+    server = make_server(args.host, args.port, config)
+    print(f"Fake LLM listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+
+from LoShu_core import PLANES
+from LoShu_llm import run_async
+from LoShu_prompts import DOMAIN_GUIDES, PLANE_GUIDES, ROLE
+
+
+# --- Reading Fragment Library ---
+#
+# Usage: GROQ_API_KEY=... python LoShu_fragments.py loshu_fragments.json
+#
+# Most of a reading discusses one small piece of the chart at a time: one square at a given
+# count, one plane as complete or incomplete, one core number. There are only a few hundred such
+# pieces, so their text is generated once, offline, and stored in a versioned JSON library.
+# A reading is then assembled from the library (sections 1 to 4) and the live LLM call writes
+# only the current-year analysis and the personal synthesis.
+
+# Location of the library file; override with the LOSHU_FRAGMENTS_PATH environment variable.
+DEFAULT_FRAGMENTS_PATH = os.environ.get("LOSHU_FRAGMENTS_PATH", "loshu_fragments.json")
+
+# Bump when the file layout or the way fragments are assembled changes.
+FRAGMENT_FORMAT = 1
+
+# How strongly a square is present, by its count in the grid.
+SQUARE_LEVELS = {
+    "missing": "is missing from the grid",
+    "single": "appears once in the grid",
+    "double": "appears twice in the grid",
+    "repeated": "appears three or more times in the grid",
+}
+PLANE_STATUSES = ("complete", "incomplete")
+CORE_NUMBERS = {
+    "psychic": ("Psychic Number", "inner self, desires, and interpersonal perception"),
+    "destiny": ("Destiny Number", "life purpose, karmic lessons, and ultimate goals"),
+    "name_number": ("Name Number", "talents, modes of expression, and professional potential"),
+    "kua": ("Kua Number", "personal energy type, favourable directions, compatible elements, and Feng Shui tips"),
+}
+# A life domain is judged by the squares its guide names: all present, some present, or none.
+DOMAIN_SQUARES = {domain: tuple(int(digit) for digit in re.findall(r"\d", squares)) for domain, _, squares in DOMAIN_GUIDES}
+DOMAIN_LEVELS = {
+    "strong": "all of these squares are present in the grid",
+    "partial": "only some of these squares are present in the grid",
+    "weak": "none of these squares are present in the grid",
+}
+
+FRAGMENT_SYSTEM_PROMPT = ROLE + """
+You are writing one reusable passage of a larger reading. It will be shown to everyone whose chart has the feature described, so address the reader as "you", do not use a name, and do not mention any other part of the chart.
+Write 80 to 150 words of plain paragraphs, without headings or lists.
+"""
+
+
+def square_level(count):
+    if count == 0:
+        return "missing"
+    if count == 1:
+        return "single"
+    if count == 2:
+        return "double"
+    return "repeated"
+
+
+def domain_level(domain, counts):
+    present = sum(1 for number in DOMAIN_SQUARES[domain] if counts.get(number, 0) > 0)
+    if present == len(DOMAIN_SQUARES[domain]):
+        return "strong"
+    return "partial" if present else "weak"
+
+
+def fragment_prompts():
+    """Returns {fragment key: the request that generates it} for every fragment in a library."""
+    prompts = {}
+    for number in range(1, 10):
+        for level, phrase in SQUARE_LEVELS.items():
+            prompts[f"square:{number}:{level}"] = (
+                f"Square {number} of the Lo Shu Grid, when the number {number} {phrase}. Cover its planet, element, "
+                "direction, season and symbolic colours, the life area it governs, the strength this count gives it "
+                "and its influence, and a short real-life example of this energy."
+            )
+    for plane, theme in PLANE_GUIDES:
+        for status in PLANE_STATUSES:
+            prompts[f"plane:{plane}:{status}"] = f"The {plane} when it is {status} in the Lo Shu Grid. Discuss {theme}."
+    for core, (label, theme) in CORE_NUMBERS.items():
+        for value in range(1, 10):
+            prompts[f"{core}:{value}"] = (
+                f"A {label} of {value}. Discuss {theme}, based on the {label} and the planet associated with it."
+            )
+    for domain, task, squares in DOMAIN_GUIDES:
+        for level, phrase in DOMAIN_LEVELS.items():
+            prompts[f"domain:{domain}:{level}"] = (
+                f"{domain}, for a Lo Shu Grid in which {phrase} ({squares}). {task}."
+            )
+    return prompts
+
+
+def library_version(model):
+    """Identifies the library a model and the current fragment prompts produce.
+
+    A library whose stored version no longer matches was built from older prompts and is stale.
+    """
+    payload = json.dumps([FRAGMENT_FORMAT, model, FRAGMENT_SYSTEM_PROMPT, sorted(fragment_prompts().items())])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class FragmentLibrary:
+    """A complete set of fragments, and the assembly of reading sections 1 to 4 from them."""
+
+    def __init__(self, model, fragments, version=None):
+        self.model = model
+        self.fragments = fragments
+        self.version = version or library_version(model)
+
+    @classmethod
+    def load(cls, path=DEFAULT_FRAGMENTS_PATH):
+        """Reads a library, rejecting one that is stale or incomplete."""
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("format") != FRAGMENT_FORMAT or data.get("version") != library_version(data.get("model")):
+            raise ValueError(f"{path} was built from other fragment prompts; rebuild it with LoShu_fragments.py.")
+        missing = fragment_prompts().keys() - data["fragments"].keys()
+        if missing:
+            raise ValueError(f"{path} is missing {len(missing)} fragment(s); rerun LoShu_fragments.py to finish it.")
+        return cls(data["model"], data["fragments"], data["version"])
+
+    def assemble(self, name, counts, psychic, destiny, kua, name_number, completed_planes):
+        """Returns sections 1 to 4 of a reading as markdown, ending with a blank line."""
+        fragments = self.fragments
+        parts = ["## 1. Individual Squares Analysis\n"]
+        for number in range(1, 10):
+            count = counts.get(number, 0)
+            level = square_level(count)
+            heading = f"Square {number} (missing)" if count == 0 else f"Square {number} (appears {count} time{'s' if count > 1 else ''})"
+            parts.append(f"### {heading}\n{fragments[f'square:{number}:{level}']}\n")
+
+        parts.append("## 2. Plane Significance\n")
+        for plane in PLANES:
+            status = "complete" if plane in completed_planes else "incomplete"
+            parts.append(f"### {plane}: {status.title()}\n{fragments[f'plane:{plane}:{status}']}\n")
+
+        parts.append(f"## 3. Core Number Analysis for {name}\n")
+        for core, value in (("psychic", psychic), ("destiny", destiny), ("name_number", name_number), ("kua", kua)):
+            label = CORE_NUMBERS[core][0]
+            # A name without any letters of the name chart has no name number.
+            if value:
+                parts.append(f"### {label} ({value})\n{fragments[f'{core}:{value}']}\n")
+
+        parts.append("## 4. Life Domains\n")
+        for domain, _, _ in DOMAIN_GUIDES:
+            parts.append(f"### {domain}\n{fragments[f'domain:{domain}:{domain_level(domain, counts)}']}\n")
+        return "\n".join(parts) + "\n"
+
+
+def _save(path, model, fragments):
+    data = {"format": FRAGMENT_FORMAT, "version": library_version(model), "model": model, "fragments": dict(sorted(fragments.items()))}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+async def abuild_library(llm, model, path=DEFAULT_FRAGMENTS_PATH, max_concurrency=4, force=False):
+    """Generates every fragment with `llm` and writes the library to `path`.
+
+    Fragments already in an up-to-date file at `path` are kept, and the file is saved after
+    each fragment, so an interrupted build resumes where it stopped. Requests are not retried
+    here; pass a client that retries on its own, such as LoShu_backend.get_llm(). Returns the library.
+    """
+    fragments = {}
+    if not force and os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("format") == FRAGMENT_FORMAT and data.get("version") == library_version(model):
+            fragments = data["fragments"]
+
+    prompts = fragment_prompts()
+    todo = [key for key in prompts if key not in fragments]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(key):
+        messages = [("system", FRAGMENT_SYSTEM_PROMPT), ("human", prompts[key])]
+        async with semaphore:
+            response = await llm.ainvoke(messages)
+        fragments[key] = response.content.strip()
+        _save(path, model, fragments)
+
+    await asyncio.gather(*(generate(key) for key in todo))
+    _save(path, model, fragments)
+    return FragmentLibrary(model, fragments)
+
+
+def build_library(llm, model, path=DEFAULT_FRAGMENTS_PATH, max_concurrency=4, force=False):
+    """Synchronous wrapper around abuild_library, run on the shared LLM event loop."""
+    return run_async(abuild_library(llm, model, path, max_concurrency, force))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Lo Shu reading fragment library.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_FRAGMENTS_PATH)
+    parser.add_argument("--concurrency", type=int, default=4, help="Fragment requests in flight at once.")
+    parser.add_argument("--force", action="store_true", help="Regenerate every fragment, even if the file is up to date.")
+    args = parser.parse_args(argv)
+
+    import LoShu_backend
+    library = build_library(LoShu_backend.get_llm(), LoShu_backend.MODEL_NAME, args.path, args.concurrency, force=args.force)
+    print(f"Wrote {len(library.fragments)} fragments to {args.path} (version {library.version})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,501 @@
+import asyncio
+import atexit
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple, Optional
+
+import LoShu_metrics
+
+
+# --- Resilient LLM Client ---
+#
+# Wraps the chat models behind get_llm with the same invoke/stream/ainvoke interface, adding:
+#   * a deadline per request, covering queueing, retries and fallbacks (for streams, the wait
+#     for the first chunk);
+#   * retries with full-jitter exponential backoff on rate limits and transient errors,
+#     honouring Retry-After;
+#   * a hedged duplicate of a request still unanswered after the recent p95 latency, the first
+#     answer winning (at most a small fraction of requests are hedged, and none when every
+#     request slot is busy);
+#   * an ordered fallback chain of models or endpoints, tried when one keeps failing;
+#   * one shared HTTP connection pool and a cap on LLM requests in flight in the process.
+#
+# Settings come from the LOSHU_LLM_* environment variables below. Point GROQ_API_BASE at
+# LoShu_fake_llm (with --rate-limit-rate, --error-rate or --latency) to exercise them offline.
+
+# Seconds a request may take in total, including waiting for a slot, retries and fallbacks.
+DEFAULT_DEADLINE = float(os.environ.get("LOSHU_LLM_DEADLINE", 90))
+# Retries of one model before falling back to the next one.
+DEFAULT_RETRIES = int(os.environ.get("LOSHU_LLM_RETRIES", 3))
+# When to hedge: "p95" (or any "pNN") of recent latencies, a number of seconds, or "off".
+DEFAULT_HEDGE_AFTER = os.environ.get("LOSHU_LLM_HEDGE_AFTER", "p95")
+# Most LLM requests in flight at once in this process, hedges included.
+DEFAULT_CONCURRENCY = int(os.environ.get("LOSHU_LLM_CONCURRENCY", 16))
+# Share of requests that may be hedged.
+MAX_HEDGE_FRACTION = 0.1
+
+# Hedge delays used until enough latencies are known, and the fewest samples to trust a quantile.
+INITIAL_HEDGE_DELAY = {"invoke": 30.0, "stream": 3.0}
+MIN_LATENCY_SAMPLES = 20
+BACKOFF_BASE, BACKOFF_CAP = 0.5, 8.0
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every model in the fallback chain failed with rate limits or transient errors."""
+
+
+class LLMDeadlineError(LLMUnavailableError, TimeoutError):
+    """A request did not get an answer within its deadline."""
+
+
+class Endpoint(NamedTuple):
+    """One model on one Groq-compatible server; None means the default key or endpoint."""
+    model: str
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+
+    @property
+    def label(self):
+        return f"{self.model}@{self.base_url}" if self.base_url else self.model
+
+
+def parse_endpoints(spec):
+    """Parses "model" or "model@base_url" entries separated by commas into Endpoints."""
+    endpoints = []
+    for entry in spec.split(","):
+        model, _, base_url = entry.strip().partition("@")
+        if model:
+            endpoints.append(Endpoint(model, base_url or None))
+    return endpoints
+
+
+def _status(error):
+    status = getattr(error, "status_code", None)
+    return status if status is not None else getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_rate_limit(error):
+    return _status(error) == 429
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections are worth another try."""
+    status = _status(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return isinstance(error, (TimeoutError, ConnectionError)) or bool(names & {"APIConnectionError", "TransportError"})
+
+
+def retry_after(error):
+    """The server's Retry-After in seconds, if it sent one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, but no sooner than the server's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after(error) or 0)
+
+
+class ConcurrencyLimiter:
+    """Caps the LLM requests in flight across all threads and event loops of a process."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self, timeout):
+        """Takes a slot, waiting up to `timeout` seconds; returns False if none came free."""
+        return self._semaphore.acquire(timeout=max(timeout, 0))
+
+    async def aacquire(self, timeout):
+        """Like acquire, but waits without blocking the event loop."""
+        end = time.monotonic() + timeout
+        delay = 0.001
+        while not self._semaphore.acquire(blocking=False):
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return True
+
+    def release(self):
+        self._semaphore.release()
+
+    @property
+    def available(self):
+        """Slots free right now."""
+        return self._semaphore._value
+
+
+class LatencyWindow:
+    """The most recent latencies of one kind of request, for hedging quantiles."""
+
+    def __init__(self, size=256):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        """The q-quantile of the window, or None with fewer than MIN_LATENCY_SAMPLES samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+def _open_stream(model, messages, kwargs):
+    """Starts a stream and waits for its first chunk; returns (first chunk or None, the rest)."""
+    chunks = iter(model.stream(messages, **kwargs))
+    return next(chunks, None), chunks
+
+
+def _close(chunks):
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+# Async HTTP clients opened on each event loop, closed with the shared loop at exit.
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def shared_loop():
+    """The process's long-lived event loop for LLM work, started on first use on a daemon thread."""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = asyncio.new_event_loop()
+            threading.Thread(target=_shared_loop.run_forever, name="loshu-llm-loop", daemon=True).start()
+            atexit.register(_stop_shared_loop)
+        return _shared_loop
+
+
+async def _aclose_all(clients):
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+def _stop_shared_loop():
+    # Closes the shared loop's connections at exit rather than leaving the sockets to the collector.
+    loop = _shared_loop
+    clients = _loop_clients.pop(loop, [])
+    if clients:
+        try:
+            asyncio.run_coroutine_threadsafe(_aclose_all(clients), loop).result(timeout=5)
+        except Exception:
+            pass
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def run_async(coro):
+    """Runs `coro` on shared_loop() from synchronous code and returns its result.
+
+    Use it instead of asyncio.run for coroutines that call ainvoke: each asyncio.run is a new
+    event loop, which would open a new async connection pool and abandon it on return.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("run_async cannot be called from a running event loop; await the coroutine instead.")
+    future = asyncio.run_coroutine_threadsafe(coro, shared_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+class ResilientLLM:
+    """A chat model client with deadlines, retries, hedging and fallbacks.
+
+    `models` is a list of (label, chat model) pairs tried in order; `async_models`, if given,
+    returns such a list for the running event loop, for clients bound to one loop.
+    """
+
+    def __init__(self, models, deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, hedge_after=DEFAULT_HEDGE_AFTER, concurrency=DEFAULT_CONCURRENCY, max_hedge_fraction=MAX_HEDGE_FRACTION, async_models=None):
+        if not models:
+            raise ValueError("ResilientLLM needs at least one model.")
+        self.models = list(models)
+        self.async_models = async_models or (lambda: self.models)
+        self.deadline = deadline
+        self.retries = retries
+        self.max_hedge_fraction = max_hedge_fraction
+        self.limiter = ConcurrencyLimiter(concurrency)
+        self._hedge_quantile, self._hedge_delay = self._parse_hedge_after(hedge_after)
+        self._latency = {kind: LatencyWindow() for kind in INITIAL_HEDGE_DELAY}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges = 0
+        # Room for every slot plus the losing hedges still finishing in the background.
+        self._pool = ThreadPoolExecutor(max_workers=2 * concurrency, thread_name_prefix="loshu-llm")
+
+    @classmethod
+    def for_endpoints(cls, endpoints, temperature=0, **settings):
+        """Builds ChatGroq clients for `endpoints` that share one HTTP connection pool."""
+        import httpx
+        from langchain_groq import ChatGroq
+
+        concurrency = settings.get("concurrency", DEFAULT_CONCURRENCY)
+        deadline = settings.get("deadline", DEFAULT_DEADLINE)
+        limits = httpx.Limits(max_connections=2 * concurrency, max_keepalive_connections=concurrency)
+        http_client = httpx.Client(limits=limits)
+
+        def build(endpoint, http_async_client=None):
+            # Retries are ours; the client's own timeout only stops losing hedges lingering.
+            return ChatGroq(
+                model=endpoint.model, groq_api_key=endpoint.api_key, base_url=endpoint.base_url, temperature=temperature,
+                max_retries=0, timeout=deadline, http_client=http_client, http_async_client=http_async_client,
+            )
+
+        # Async connections belong to the event loop that opened them, so each loop gets its own
+        # pool, kept for the life of the process. Synchronous callers run their coroutines on
+        # shared_loop() through run_async, so they all reuse that loop's pool.
+        loop_models = weakref.WeakKeyDictionary()
+        lock = threading.Lock()
+
+        def async_models():
+            loop = asyncio.get_running_loop()
+            with lock:
+                if loop not in loop_models:
+                    client = httpx.AsyncClient(limits=limits)
+                    _loop_clients.setdefault(loop, []).append(client)
+                    loop_models[loop] = [(endpoint.label, build(endpoint, client)) for endpoint in endpoints]
+                return loop_models[loop]
+
+        return cls([(endpoint.label, build(endpoint)) for endpoint in endpoints], async_models=async_models, **settings)
+
+    @staticmethod
+    def _parse_hedge_after(hedge_after):
+        if hedge_after is None or str(hedge_after).lower() in ("off", "none", ""):
+            return None, None
+        if isinstance(hedge_after, str) and hedge_after.lower().startswith("p"):
+            return float(hedge_after[1:]) / 100, None
+        return None, float(hedge_after)
+
+    # --- Chat model interface ---
+
+    def invoke(self, messages, **kwargs):
+        return self._call(lambda model: model.invoke(messages, **kwargs), "invoke")
+
+    async def ainvoke(self, messages, **kwargs):
+        return await self._acall(lambda model: model.ainvoke(messages, **kwargs))
+
+    def stream(self, messages, **kwargs):
+        """Yields chunks from the first model to start answering; retries and fallbacks
+        happen only before the first chunk, so a caller never sees a restarted stream."""
+        first, chunks = self._call(lambda model: _open_stream(model, messages, kwargs), "stream")
+        try:
+            if first is not None:
+                yield first
+            yield from chunks
+        finally:
+            _close(chunks)
+            self.limiter.release()
+
+    # --- Hedging ---
+
+    def _hedge_time(self, kind, started):
+        """When to send a hedged duplicate of a request started at `started`, or None."""
+        if self._hedge_quantile is not None:
+            delay = self._latency[kind].quantile(self._hedge_quantile)
+            delay = INITIAL_HEDGE_DELAY[kind] if delay is None else delay
+        else:
+            delay = self._hedge_delay
+        return None if delay is None else started + delay
+
+    def _may_hedge(self, kind):
+        """Takes a slot for a hedge, unless too many requests were hedged or none is free."""
+        with self._lock:
+            if self._hedges >= self.max_hedge_fraction * self._requests:
+                return False
+            if not self.limiter.acquire(0):
+                return False
+            self._hedges += 1
+        LoShu_metrics.record_hedge(kind)
+        return True
+
+    def _finished(self, kind, label, started):
+        self._latency[kind].add(time.monotonic() - started)
+        LoShu_metrics.record_llm(label, "ok")
+
+    # --- Synchronous requests ---
+
+    def _submit(self, request, model, kind):
+        """Runs a request holding a slot taken by the caller on the pool, releasing it when done."""
+        future = self._pool.submit(request, model)
+        future.add_done_callback(self._release_stream if kind == "stream" else self._release)
+        return future
+
+    def _release(self, future):
+        self.limiter.release()
+
+    def _release_stream(self, future):
+        # A stream that opened keeps its slot until its reader, or _discard, closes it.
+        if future.cancelled() or future.exception() is not None:
+            self.limiter.release()
+
+    def _discard(self, future):
+        # A losing stream that opened anyway is closed, giving back its slot.
+        if not future.cancelled() and future.exception() is None:
+            _close(future.result()[1])
+            self.limiter.release()
+
+    def _attempt(self, request, label, model, deadline, kind):
+        """One try against one model, hedged if it is slow. Returns the first success."""
+        if not self.limiter.acquire(deadline - time.monotonic()):
+            raise LLMDeadlineError(f"No free LLM request slot within the {self.deadline:g}s deadline.")
+        started = time.monotonic()
+        futures = [self._submit(request, model, kind)]
+        hedge_at = self._hedge_time(kind, started)
+        error = None
+        try:
+            while futures:
+                wake = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, _ = wait(futures, timeout=max(wake - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures.remove(future)
+                    if future.exception() is None:
+                        self._finished(kind, label, started)
+                        return future.result()
+                    error = error or future.exception()
+                if futures and time.monotonic() >= deadline:
+                    raise LLMDeadlineError(f"{label} did not answer within the {self.deadline:g}s deadline.")
+                if futures and hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    if self._may_hedge(kind):
+                        futures.append(self._submit(request, model, kind))
+            raise error
+        finally:
+            # Losers run on in the background, bounded by the client timeout.
+            if kind == "stream":
+                for future in futures:
+                    future.add_done_callback(self._discard)
+
+    def _call(self, request, kind):
+        deadline = self._start()
+        last_error = None
+        for position, (label, model) in enumerate(self.models):
+            if position:
+                LoShu_metrics.record_fallback(label)
+            for retry in range(self.retries + 1):
+                try:
+                    return self._attempt(request, label, model, deadline, kind)
+                except LLMDeadlineError:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if not is_retryable(e) and position == len(self.models) - 1:
+                        raise
+                    delay = self._retry_delay(e, label, retry, deadline)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+        raise self._unavailable(last_error)
+
+    # --- Retries and fallbacks ---
+
+    def _start(self):
+        """Counts a new request and returns its deadline."""
+        with self._lock:
+            self._requests += 1
+        return time.monotonic() + self.deadline
+
+    def _retry_delay(self, error, label, retry, deadline):
+        """Seconds to wait before retrying `label` after `error`, or None to fall back."""
+        LoShu_metrics.record_llm(label, "rate_limited" if is_rate_limit(error) else type(error).__name__)
+        if not is_retryable(error) or retry == self.retries:
+            return None
+        delay = backoff_delay(retry, error)
+        if time.monotonic() + delay >= deadline:
+            return None
+        LoShu_metrics.record_retry(label, "rate_limit" if is_rate_limit(error) else "error")
+        return delay
+
+    @staticmethod
+    def _unavailable(last_error):
+        error = LLMUnavailableError(f"Every LLM endpoint failed; the last error was {type(last_error).__name__}: {last_error}")
+        error.__cause__ = last_error
+        return error
+
+    # --- Asynchronous requests ---
+
+    def _spawn(self, request, model):
+        task = asyncio.ensure_future(request(model))
+        task.add_done_callback(self._release_task)
+        return task
+
+    def _release_task(self, task):
+        # Runs even for a task cancelled before it started; marks losers' errors as seen.
+        self.limiter.release()
+        if not task.cancelled():
+            task.exception()
+
+    async def _aattempt(self, request, label, model, deadline):
+        if not await self.limiter.aacquire(deadline - time.monotonic()):
+            raise LLMDeadlineError(f"No free LLM request slot within the {self.deadline:g}s deadline.")
+        started = time.monotonic()
+        tasks = [self._spawn(request, model)]
+        hedge_at = self._hedge_time("invoke", started)
+        error = None
+        try:
+            while tasks:
+                wake = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(tasks, timeout=max(wake - time.monotonic(), 0), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        self._finished("invoke", label, started)
+                        return task.result()
+                    error = error or task.exception()
+                if tasks and time.monotonic() >= deadline:
+                    raise LLMDeadlineError(f"{label} did not answer within the {self.deadline:g}s deadline.")
+                if tasks and hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    if self._may_hedge("invoke"):
+                        tasks.append(self._spawn(request, model))
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _acall(self, request):
+        deadline = self._start()
+        last_error = None
+        models = self.async_models()
+        for position, (label, model) in enumerate(models):
+            if position:
+                LoShu_metrics.record_fallback(label)
+            for retry in range(self.retries + 1):
+                try:
+                    return await self._aattempt(request, label, model, deadline)
+                except LLMDeadlineError:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if not is_retryable(e) and position == len(models) - 1:
+                        raise
+                    delay = self._retry_delay(e, label, retry, deadline)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+        raise self._unavailable(last_error)
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+from LoShu_llm import LLMDeadlineError, LLMUnavailableError, ResilientLLM
+
+
+# --- LLM Client Checks ---
+#
+# Usage: python LoShu_llm_check.py
+#
+# Drives ResilientLLM through hedges, abandoned streams, deadlines, retries and fallbacks
+# against scripted in-process models, and checks after each scenario that every request slot
+# of its ConcurrencyLimiter comes back once the background requests finish. A leaked slot
+# would make the process slowly stop sending LLM requests at all. Exits non-zero on failure.
+
+CONCURRENCY = 4
+# Seconds to wait for losing hedges and abandoned requests to finish in the background.
+SETTLE_TIMEOUT = 5
+
+
+class ScriptedModel:
+    """A chat model whose requests take `delays[i]` seconds (the last one repeating) and then
+    answer, or raise `errors[i]` if one is given. Streams wait the delay before the first chunk."""
+
+    def __init__(self, delays, errors=(), chunks=("Your ", "chart ", "reads ", "well.")):
+        self.delays = list(delays)
+        self.errors = list(errors)
+        self.chunks = chunks
+        self.calls = 0
+        self.closed = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+        delay = self.delays[min(call, len(self.delays) - 1)]
+        error = self.errors[call] if call < len(self.errors) else None
+        return delay, error
+
+    def invoke(self, messages, **kwargs):
+        delay, error = self._next()
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return "".join(self.chunks)
+
+    async def ainvoke(self, messages, **kwargs):
+        delay, error = self._next()
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return "".join(self.chunks)
+
+    def stream(self, messages, **kwargs):
+        delay, error = self._next()
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        try:
+            yield from self.chunks
+        finally:
+            with self._lock:
+                self.closed += 1
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def client(*models, deadline=2.0, hedge_after=0.05, retries=2):
+    labelled = [(f"model-{i}", model) for i, model in enumerate(models)]
+    return ResilientLLM(labelled, deadline=deadline, retries=retries, hedge_after=hedge_after, concurrency=CONCURRENCY, max_hedge_fraction=1.0)
+
+
+def settle(llm):
+    """Waits for every slot to come back; raises AssertionError with the count if some do not."""
+    end = time.monotonic() + SETTLE_TIMEOUT
+    while llm.limiter.available != CONCURRENCY and time.monotonic() < end:
+        time.sleep(0.01)
+    if llm.limiter.available != CONCURRENCY:
+        raise AssertionError(f"{CONCURRENCY - llm.limiter.available} of {CONCURRENCY} request slots were not returned.")
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def check_hedged_stream():
+    # The first stream stalls before its first chunk, so a hedge is sent and wins.
+    model = ScriptedModel([0.5, 0.0])
+    llm = client(model)
+    expect("".join(llm.stream([])) == "Your chart reads well.", "the hedged stream returned the wrong text")
+    expect(model.calls == 2, f"expected a hedge, got {model.calls} request(s)")
+    settle(llm)
+    expect(model.closed == 2, "the losing stream was not closed")
+
+
+def check_abandoned_stream():
+    model = ScriptedModel([0.0])
+    llm = client(model, hedge_after=None)
+    chunks = llm.stream([])
+    next(chunks)
+    chunks.close()
+    settle(llm)
+
+
+def check_stream_deadline():
+    # Both the request and its hedge open only after the deadline, then have to be discarded.
+    model = ScriptedModel([0.4])
+    llm = client(model, deadline=0.2)
+    try:
+        next(llm.stream([]))
+    except LLMDeadlineError:
+        pass
+    else:
+        raise AssertionError("the stream did not hit its deadline")
+    settle(llm)
+    expect(model.closed == model.calls, "a stream opened after the deadline was not closed")
+
+
+def check_invoke_deadline():
+    llm = client(ScriptedModel([0.4]), deadline=0.2)
+    try:
+        llm.invoke([])
+    except LLMDeadlineError:
+        pass
+    else:
+        raise AssertionError("invoke did not hit its deadline")
+    settle(llm)
+
+
+def check_ainvoke_hedge_and_deadline():
+    model = ScriptedModel([0.5, 0.0])
+    llm = client(model)
+    expect(asyncio.run(llm.ainvoke([])) == "Your chart reads well.", "the hedged ainvoke returned the wrong text")
+    expect(model.calls == 2, f"expected a hedge, got {model.calls} request(s)")
+    settle(llm)
+
+    llm = client(ScriptedModel([0.4]), deadline=0.2)
+    try:
+        asyncio.run(llm.ainvoke([]))
+    except LLMDeadlineError:
+        pass
+    else:
+        raise AssertionError("ainvoke did not hit its deadline")
+    settle(llm)
+
+
+def check_slot_wait_deadline():
+    # With every slot held by open streams, a further request times out waiting for one.
+    llm = client(ScriptedModel([0.0]), deadline=0.2, hedge_after=None)
+    held = [llm.stream([]) for _ in range(CONCURRENCY)]
+    for chunks in held:
+        next(chunks)
+    try:
+        llm.invoke([])
+    except LLMDeadlineError:
+        pass
+    else:
+        raise AssertionError("invoke did not time out waiting for a slot")
+    for chunks in held:
+        chunks.close()
+    settle(llm)
+
+
+def check_retries_and_fallback():
+    llm = client(ScriptedModel([0.0], errors=[ServerError("busy")]), hedge_after=None)
+    expect(llm.invoke([]) == "Your chart reads well.", "a transient error was not retried")
+    settle(llm)
+
+    failing, backup = ScriptedModel([0.0], errors=[ServerError("down")] * 3), ScriptedModel([0.0])
+    llm = client(failing, backup, hedge_after=None)
+    expect("".join(llm.stream([])) == "Your chart reads well.", "the stream did not fall back")
+    expect(backup.calls == 1, "the fallback model was not used")
+    settle(llm)
+
+    llm = client(ScriptedModel([0.0], errors=[ServerError("down")] * 3), hedge_after=None)
+    try:
+        asyncio.run(llm.ainvoke([]))
+    except LLMUnavailableError:
+        pass
+    else:
+        raise AssertionError("exhausted retries did not raise LLMUnavailableError")
+    settle(llm)
+
+    model = ScriptedModel([0.0], errors=[BadRequest("bad")])
+    llm = client(model, hedge_after=None)
+    try:
+        llm.invoke([])
+    except BadRequest:
+        pass
+    else:
+        raise AssertionError("a non-retryable error was not raised")
+    expect(model.calls == 1, "a non-retryable error was retried")
+    settle(llm)
+
+
+CHECKS = {
+    "hedged_stream": check_hedged_stream,
+    "abandoned_stream": check_abandoned_stream,
+    "stream_deadline": check_stream_deadline,
+    "invoke_deadline": check_invoke_deadline,
+    "ainvoke_hedge_and_deadline": check_ainvoke_hedge_and_deadline,
+    "slot_wait_deadline": check_slot_wait_deadline,
+    "retries_and_fallback": check_retries_and_fallback,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that ResilientLLM returns every request slot.")
+    parser.add_argument("checks", nargs="*", help=f"Checks to run (default: all): {', '.join(CHECKS)}.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+    failed = 0
+    for name in args.checks or CHECKS:
+        started = time.perf_counter()
+        try:
+            CHECKS[name]()
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {name}: {e}")
+        else:
+            print(f"ok   {name} ({time.perf_counter() - started:.2f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
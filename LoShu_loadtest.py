@@ -0,0 +1,167 @@
+import argparse
+import os
+import random
+import string
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import LoShu_fake_llm
+
+
+# --- Load-Test Harness ---
+#
+# Usage: python LoShu_loadtest.py --fake-server --sessions 50 --requests 500
+#        python LoShu_loadtest.py --mode app --fake-server --sessions 8 --requests 32
+#
+# Runs many concurrent simulated users against one process and reports throughput,
+# time-to-first-token and tail latency. "backend" mode calls the reading path the way the
+# Streamlit page does; "app" mode runs frontend.py itself through Streamlit's AppTest, one
+# simulated session per request. With --fake-server a local stand-in from LoShu_fake_llm
+# answers the LLM calls, so no Groq quota is spent.
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def random_profile(rng):
+    """A random (name, day, month, year, gender) with a valid date."""
+    name = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))).title()
+    return name, rng.randint(1, 28), rng.randint(1, 12), rng.randint(1950, 2010), rng.choice(["Male", "Female"])
+
+
+def backend_session(profile):
+    """One page submission through the backend: the grid, then the streamed reading."""
+    import LoShu_backend
+    name, day, month, year, gender = profile
+    started = time.perf_counter()
+    counts, psychic, destiny, kua, name_number = LoShu_backend.calculate_numbers(name, day, month, year, gender)
+    completed_planes, incomplete_planes = LoShu_backend.check_planes(counts)
+    curr_year_num = LoShu_backend.year_number(day, month)
+    first_token = None
+    for _ in LoShu_backend.stream_interpretation(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+    return first_token, time.perf_counter() - started
+
+
+def app_session(profile, timeout):
+    """One page submission through the real Streamlit script, via AppTest."""
+    from streamlit.testing.v1 import AppTest
+    name, day, month, year, gender = profile
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend.py"), default_timeout=timeout)
+    app.run()
+    app.selectbox[0].select(day)
+    app.selectbox[1].select(month)
+    app.number_input[0].set_value(year)
+    app.selectbox[2].select(gender)
+    app.text_input[0].input(name)
+    started = time.perf_counter()
+    app.button[0].click().run()
+    elapsed = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    # Incomplete planes are also shown with st.error; those start with a cross mark.
+    failures = [element.value for element in app.error if not element.value.startswith("✗")]
+    if failures:
+        raise RuntimeError(failures[0])
+    return None, elapsed
+
+
+def run(mode, sessions, requests, seed=0, repeat_profiles=0, timeout=300):
+    """Runs `requests` simulated submissions with `sessions` in flight and returns a report dict."""
+    rng = random.Random(seed)
+    if repeat_profiles:
+        pool = [random_profile(rng) for _ in range(repeat_profiles)]
+        profiles = [rng.choice(pool) for _ in range(requests)]
+    else:
+        profiles = [random_profile(rng) for _ in range(requests)]
+
+    ttfts, totals, errors = [], [], Counter()
+    lock = threading.Lock()
+
+    def one(profile):
+        try:
+            if mode == "app":
+                ttft, total = app_session(profile, timeout)
+            else:
+                ttft, total = backend_session(profile)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        with lock:
+            if ttft is not None:
+                ttfts.append(ttft)
+            totals.append(total)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(one, profiles))
+    wall = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "requests": requests,
+        "completed": len(totals),
+        "errors": dict(errors),
+        "wall_seconds": wall,
+        "throughput_per_sec": len(totals) / wall,
+        "ttft": {q: percentile(ttfts, q) for q in (50, 95, 99)},
+        "total": {q: percentile(totals, q) for q in (50, 95, 99)},
+    }
+
+
+def format_report(report):
+    lines = [
+        f"{report['mode']} mode: {report['completed']}/{report['requests']} completed with {report['sessions']} concurrent sessions in {report['wall_seconds']:.1f}s",
+        f"throughput: {report['throughput_per_sec']:.2f} readings/s",
+    ]
+    if report["mode"] == "backend":
+        lines.append("time to first token: " + "  ".join(f"p{q} {v:.3f}s" for q, v in report["ttft"].items()))
+    lines.append("total latency:       " + "  ".join(f"p{q} {v:.3f}s" for q, v in report["total"].items()))
+    if report["errors"]:
+        lines.append("errors: " + ", ".join(f"{name} x{count}" for name, count in report["errors"].items()))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Lo Shu reading path or Streamlit app.")
+    parser.add_argument("--mode", choices=["backend", "app"], default="backend")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated users.")
+    parser.add_argument("--requests", type=int, default=100, help="Total submissions.")
+    parser.add_argument("--repeat-profiles", type=int, default=0, help="Draw submissions from this many distinct profiles (0 = all distinct).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="Per-session timeout in app mode.")
+    parser.add_argument("--keep-cache", action="store_true", help="Use the configured reading cache instead of a fresh in-memory one.")
+    parser.add_argument("--fake-server", action="store_true", help="Start a local fake LLM endpoint and point the backend at it.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake server: seconds before the first token.")
+    parser.add_argument("--tokens-per-sec", type=float, default=200, help="Fake server: streaming rate.")
+    parser.add_argument("--reading-tokens", type=int, default=3000, help="Fake server: reading length.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake server: fraction of HTTP 500 answers.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fake server: fraction of HTTP 429 answers.")
+    args = parser.parse_args(argv)
+
+    # The backend reads these when it first builds its cache and client, so set them up front.
+    if not args.keep_cache:
+        os.environ["LOSHU_CACHE_PATH"] = ":memory:"
+    if args.fake_server:
+        config = LoShu_fake_llm.FakeLLMConfig(args.latency, args.tokens_per_sec, args.reading_tokens, args.error_rate, args.rate_limit_rate, args.seed)
+        server = LoShu_fake_llm.start_server(config=config)
+        os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+        os.environ.setdefault("GROQ_API_KEY", "fake")
+
+    report = run(args.mode, args.sessions, args.requests, args.seed, args.repeat_profiles, args.timeout)
+    print(format_report(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
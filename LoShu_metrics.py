@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# --- Instrumentation ---
+#
+# In-process counters and latency histograms for the backend stages and LLM calls. Every span
+# is also logged as one JSON line on the "LoShu.metrics" logger. The metrics can be read in
+# Prometheus text format from render_prometheus, from a file (LOSHU_METRICS_FILE) or from a
+# small HTTP endpoint (LOSHU_METRICS_PORT).
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+
+logger = logging.getLogger("LoShu.metrics")
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_descriptions = {
+    "loshu_stage_seconds": "Duration of instrumented backend stages.",
+    "loshu_llm_ttft_seconds": "Time from LLM request to first streamed token.",
+    "loshu_tokens_total": "Prompt and completion tokens, as reported or estimated.",
+    "loshu_reading_cache_total": "Reading cache lookups by result.",
+    "loshu_errors_total": "Failures by stage and exception class.",
+    "loshu_singleflight_total": "Reading requests that started an LLM call (leader) or joined one in flight (follower).",
+    "loshu_llm_requests_total": "LLM request attempts by endpoint and outcome.",
+    "loshu_llm_retries_total": "LLM requests retried after a rate limit or transient error.",
+    "loshu_llm_hedges_total": "Hedged duplicate LLM requests sent after the hedging delay.",
+    "loshu_llm_fallbacks_total": "LLM requests passed on to a fallback endpoint.",
+    "loshu_api_shed_total": "HTTP API requests refused with 503 because their endpoint was at capacity.",
+}
+_server = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Adds `value` to a counter."""
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """Records one observation in a latency histogram."""
+    with _lock:
+        key = _key(name, labels)
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+
+
+def log_event(event, **fields):
+    """Writes one structured JSON log line."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+
+def record_error(stage, error):
+    inc("loshu_errors_total", stage=stage, error=type(error).__name__)
+
+
+def record_cache(hit):
+    inc("loshu_reading_cache_total", result="hit" if hit else "miss")
+    log_event("reading_cache", result="hit" if hit else "miss")
+
+
+def record_flight(kind, leader):
+    role = "leader" if leader else "follower"
+    inc("loshu_singleflight_total", kind=kind, role=role)
+    if not leader:
+        log_event("singleflight", kind=kind, role=role)
+
+
+def record_llm(endpoint, outcome):
+    inc("loshu_llm_requests_total", endpoint=endpoint, outcome=outcome)
+    if outcome != "ok":
+        log_event("llm_error", endpoint=endpoint, outcome=outcome)
+
+
+def record_retry(endpoint, reason):
+    inc("loshu_llm_retries_total", endpoint=endpoint, reason=reason)
+
+
+def record_hedge(kind):
+    inc("loshu_llm_hedges_total", kind=kind)
+    log_event("llm_hedge", kind=kind)
+
+
+def record_fallback(endpoint):
+    inc("loshu_llm_fallbacks_total", endpoint=endpoint)
+    log_event("llm_fallback", endpoint=endpoint)
+
+
+def record_tokens(usage, request="reading"):
+    """Counts the tokens of one LLM request, as returned by LoShu_prompts.token_usage."""
+    source = "estimated" if usage.get("estimated") else "reported"
+    inc("loshu_tokens_total", usage["input_tokens"], kind="input", source=source)
+    inc("loshu_tokens_total", usage["output_tokens"], kind="output", source=source)
+    log_event("tokens", request=request, **usage)
+
+
+@contextmanager
+def span(stage, **fields):
+    """Times a block as a stage, counting it as an error if it raises.
+
+    Yields a dict that the block may add log fields to.
+    """
+    extra = {}
+    started = time.perf_counter()
+    try:
+        yield extra
+    except BaseException as e:
+        elapsed = time.perf_counter() - started
+        observe("loshu_stage_seconds", elapsed, stage=stage)
+        if isinstance(e, Exception):
+            record_error(stage, e)
+        log_event("span", stage=stage, duration_ms=round(elapsed * 1000, 3), status="error", error=type(e).__name__, **fields, **extra)
+        raise
+    elapsed = time.perf_counter() - started
+    observe("loshu_stage_seconds", elapsed, stage=stage)
+    log_event("span", stage=stage, duration_ms=round(elapsed * 1000, 3), status="ok", **fields, **extra)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"' for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus():
+    """Returns every metric in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, {**value, "buckets": list(value["buckets"])}) for key, value in _histograms.items())
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {_descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), histogram in histograms:
+        header(name, "histogram")
+        for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Writes the metrics to `path` (default LOSHU_METRICS_FILE) for a node-exporter textfile collector."""
+    path = path or os.environ.get("LOSHU_METRICS_FILE")
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """Serves /metrics on a background thread, once per process.
+
+    `port` defaults to LOSHU_METRICS_PORT; nothing is started if neither is set. Returns the
+    server, or None.
+    """
+    global _server
+    port = port or os.environ.get("LOSHU_METRICS_PORT")
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def reset():
+    """Clears all metrics."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
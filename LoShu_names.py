@@ -0,0 +1,188 @@
+import argparse
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from LoShu_batch import digital_root, name_sums
+
+
+# --- Name Index ---
+#
+# Usage: python LoShu_names.py build names.txt
+#        python LoShu_names.py query --number 5 --limit 20
+#        python LoShu_names.py query --variants-of Aisha --number 3
+#
+# A persistent, memory-mapped index over a name list for name suggestions. Names are sorted by
+# (name number, letter sum), so every name that reduces to a number, or has a given letter sum,
+# is one contiguous range found by binary search. A second ordering by Soundex code groups
+# spelling variants the same way.
+
+# Location of the index file; override with the LOSHU_NAMES_PATH environment variable.
+DEFAULT_NAMES_PATH = os.environ.get("LOSHU_NAMES_PATH", "loshu_names.idx")
+
+# File layout: a 24-byte header (magic, number of names, size of the name blob), then, each
+# padded to 8 bytes: name offsets into the blob (N + 1 uint64), name numbers (N uint8), letter
+# sums (N uint32), the names' positions ordered by Soundex code (N uint32), the Soundex codes in
+# that order (N uint32) and the UTF-8 blob.
+# Names are stored sorted by (name number, letter sum, name).
+_MAGIC = b"LOSHUNM1"
+_HEADER = struct.Struct("<8sQQ")
+
+_SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(["AEIOUYHW", "BFPV", "CGJKQSXZ", "DT", "L", "MN", "R"]) for letter in letters}
+
+
+def soundex(name):
+    """The Soundex code of a name packed into an int (0 if it has no ASCII letters).
+
+    Names that sound alike, such as Aisha and Ayesha, share a code.
+    """
+    letters = [char for char in name.upper() if "A" <= char <= "Z"]
+    if not letters:
+        return 0
+    digits = []
+    previous = _SOUNDEX_CODES[letters[0]]
+    for char in letters[1:]:
+        code = _SOUNDEX_CODES[char]
+        if code != "0" and code != previous:
+            digits.append(code)
+            if len(digits) == 3:
+                break
+        # H and W do not separate letters with the same code; vowels do.
+        if char not in "HW":
+            previous = code
+    digits += ["0"] * (3 - len(digits))
+    return (ord(letters[0]) - ord("A") + 1) * 1000 + int("".join(digits))
+
+
+def _padded(size):
+    return (size + 7) // 8 * 8
+
+
+def build_name_index(names, path=DEFAULT_NAMES_PATH):
+    """Indexes an iterable of names, dropping blanks and duplicates. Returns the path written."""
+    names = sorted({name.strip() for name in names} - {""})
+    sums = name_sums(names)
+    numbers = digital_root(sums)
+    order = np.lexsort((np.arange(len(names)), sums, numbers))
+    names = [names[i] for i in order]
+    sums, numbers = sums[order].astype(np.uint32), numbers[order]
+    codes = np.fromiter((soundex(name) for name in names), dtype=np.uint32, count=len(names))
+    by_sound = np.argsort(codes, kind="stable").astype(np.uint32)
+    codes = codes[by_sound]
+
+    encoded = [name.encode() for name in names]
+    offsets = np.zeros(len(names) + 1, dtype=np.uint64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.uint64, count=len(names)), out=offsets[1:])
+    blob = b"".join(encoded)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(names), len(blob)))
+        for array in (offsets, numbers, sums, by_sound, codes):
+            data = array.tobytes()
+            f.write(data + b"\0" * (_padded(len(data)) - len(data)))
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+class NameIndex:
+    """Read-only, memory-mapped view of an index written by build_name_index."""
+
+    def __init__(self, path=DEFAULT_NAMES_PATH):
+        with open(path, "rb") as f:
+            magic, n, blob_size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a Lo Shu name index.")
+        self.path = path
+        self.n = n
+        position = _HEADER.size
+        arrays = []
+        for dtype, length in ((np.uint64, n + 1), (np.uint8, n), (np.uint32, n), (np.uint32, n), (np.uint32, n)):
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=position, shape=(length,)) if length else np.empty(0, dtype=dtype))
+            position += _padded(length * np.dtype(dtype).itemsize)
+        self._offsets, self._numbers, self._sums, self._by_sound, self._sound_codes = arrays
+        self._blob = np.memmap(path, dtype=np.uint8, mode="r", offset=position, shape=(blob_size,)) if blob_size else b""
+
+    def __len__(self):
+        return self.n
+
+    def name(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode()
+
+    def _names(self, positions, limit):
+        positions = positions[:limit] if limit is not None else positions
+        return [self.name(i) for i in positions]
+
+    def _number_range(self, number):
+        return np.searchsorted(self._numbers, number, "left"), np.searchsorted(self._numbers, number, "right")
+
+    def count(self, number):
+        """How many names reduce to `number`."""
+        start, end = self._number_range(number)
+        return int(end - start)
+
+    def with_number(self, number, limit=None):
+        """Names that reduce to `number`, ordered by letter sum and then name."""
+        start, end = self._number_range(number)
+        return self._names(range(start, end), limit)
+
+    def with_letter_sum(self, total, limit=None):
+        """Names whose letters add up to `total` before reduction."""
+        start, end = self._number_range(digital_root(total))
+        sums = self._sums[start:end]
+        return self._names(range(start + np.searchsorted(sums, total, "left"), start + np.searchsorted(sums, total, "right")), limit)
+
+    def completing(self, counts, limit=None):
+        """For each square missing from a chart's counts, the names whose number fills it."""
+        return {number: self.with_number(number, limit) for number in range(1, 10) if counts.get(number, 0) == 0}
+
+    def variants(self, name, number=None, limit=None):
+        """Spelling variants of `name` (same Soundex code) in the index, optionally only those reducing to `number`."""
+        code = soundex(name)
+        if not code:
+            return []
+        start, end = np.searchsorted(self._sound_codes, code, "left"), np.searchsorted(self._sound_codes, code, "right")
+        positions = np.sort(self._by_sound[start:end])
+        if number is not None:
+            positions = positions[self._numbers[positions] == number]
+        return self._names(positions, limit)
+
+
+@lru_cache(maxsize=None)
+def open_name_index(path=DEFAULT_NAMES_PATH):
+    """Returns a shared NameIndex for `path`, mapping the file once per process."""
+    return NameIndex(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the Lo Shu name index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Index a text file with one name per line.")
+    build.add_argument("names")
+    build.add_argument("path", nargs="?", default=DEFAULT_NAMES_PATH)
+    query = subparsers.add_parser("query", help="List indexed names.")
+    query.add_argument("--path", default=DEFAULT_NAMES_PATH)
+    query.add_argument("--number", type=int, help="Only names reducing to this number.")
+    query.add_argument("--letter-sum", type=int, help="Only names with this letter sum.")
+    query.add_argument("--variants-of", help="Only spelling variants of this name.")
+    query.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.names, encoding="utf-8") as f:
+            written = build_name_index(f, args.path)
+        print(f"Wrote {written} ({len(NameIndex(written))} names)")
+    else:
+        index = NameIndex(args.path)
+        if args.variants_of:
+            found = index.variants(args.variants_of, args.number, args.limit)
+        elif args.letter_sum is not None:
+            found = index.with_letter_sum(args.letter_sum, args.limit)
+        elif args.number is not None:
+            found = index.with_number(args.number, args.limit)
+        else:
+            parser.error("Give --number, --letter-sum or --variants-of.")
+        print("\n".join(found))
@@ -0,0 +1,205 @@
+# --- Reading Prompts ---
+#
+# A reading is requested as two messages. The system message holds the instructions and never
+# varies between people, so providers that cache prompt prefixes can reuse it. The human message
+# states the person's chart data once, and the instructions refer to it by label.
+
+ROLE = """\
+You are a master numerologist with deep expertise in Lo Shu Grid analysis, Chinese metaphysics, and Vedic numerology. Provide a detailed, insightful, and holistic analysis of a person's complete numerological profile based ONLY on the chart data provided. Please don't invent or assume any information.
+Write in a warm, encouraging, and empowering tone, using clear structure with main headings marked as ## and subheadings marked as ###. Use plain text without markdown bolding.
+Labels such as Completed Planes, Incomplete Planes, Psychic Number or Current Year Number refer to the fields of the chart data. Base every plane analysis on the Completed Planes and Incomplete Planes lists.
+"""
+
+PLANE_GUIDES = [
+    ("Mental Plane (4-9-2)", "the intellect, logic, and analytical thinking"),
+    ("Emotional Plane (3-5-7)", "the feelings, intuition, and emotional sensitivity"),
+    ("Practical Plane (8-1-6)", "the ability to manifest ideas in the material world"),
+    ("Thought Plane (4-3-8)", "the ability to generate new ideas and to think in an orderly and methodical manner"),
+    ("Will Plane (9-5-1)", "the willpower, persistence, and determination to achieve the goals"),
+    ("Action Plane (2-7-6)", "the ability to put their thoughts and plans into action"),
+    ("Determination Plane (4-5-6)", 'the "Rajat Yog" and material assets, specifically land and property,'),
+    ("Compassion Plane (2-5-8)", 'the "Raj Yog" and success, wealth, name, and fame'),
+]
+
+DOMAIN_GUIDES = [
+    ("Education & Learning", "Assess learning style, optimal study methods, and academic strengths", "Square 8"),
+    ("Career & Profession", "Identify suitable fields, work style, leadership qualities, and entrepreneurial potential", "Square 1"),
+    ("Finances & Wealth", "Evaluate money management, investment outlook, property and luxury inclinations, and legal considerations", "Square 4"),
+    ("Travel & Exploration", "Indicate favourable travel directions, how journeys support growth, and auspicious timing", "Square 6"),
+    ("Family & Relationships", "Examine married life, interpersonal harmony, and children", "Square 2"),
+    ("Health & Wellness", "Discuss critical health issues and recommend physical and mental health strategies, and longevity practices", "Square 3"),
+    ("Age-Related Phases", "Highlight life periods of opportunity and challenge as per numerological cycles", "Squares 3, 6, 2 and 7"),
+    ("Challenges & Opportunities", "Summarise major life challenges and potential breakthroughs, with targeted remedies and affirmations", "Square 1 and Square 9"),
+]
+
+# The sections of a full reading, in order. None of them depend on the person.
+SECTIONS = {
+    "squares": """\
+## 1. Individual Squares Analysis
+For each square (1–9), provide:
+### Square
+- Planet, Element, Direction, Season, Symbolic Colours
+- Life area (e.g., Wealth, Relationships, Creativity)
+- Strength level (based on count) and its influence
+- Real-life example or anecdote demonstrating this energy
+""",
+    "planes": "## 2. Plane Significance\nFor each plane below, discuss the stated theme based on the strength (count/ frequency of each square) in the plane and on whether the plane is in the Completed Planes or Incomplete Planes list.\n"
+    + "".join(f"### {plane}\nDiscuss {theme}.\n" for plane, theme in PLANE_GUIDES),
+    "core_numbers": """\
+## 3. Core Number Analysis for the person (use their First Name)
+### Psychic Number (its value)
+Discuss inner self, desires, and interpersonal perception based on the Psychic Number and the planet associated with it.
+### Destiny Number (its value)
+Discuss life purpose, karmic lessons, and ultimate goals based on the Destiny Number and the planet associated with it.
+### Name Number (its value)
+Discuss talents, modes of expression, and professional potential based on the Name Number and the planet associated with it.
+### Kua Number (its value)
+Discuss personal energy type, favourable directions, compatible elements, and Feng Shui tips based on the Kua Number and the planet associated with it.
+
+### Discuss the combinations of these numbers based on the planets they govern and the mutual relationship (synergy and enmity) of those planets.
+""",
+    "life_domains": "## 4. Life Domains\nBase each domain on the Completed Planes and Incomplete Planes lists and on the strength in the Lo Shu Grid of the squares named.\n"
+    + "".join(f"### {domain}\n{task} ({squares}).\n" for domain, task, squares in DOMAIN_GUIDES),
+    "current_year": """\
+## 5. Current Year Analysis
+
+Perform the analysis of the current year based on the combination of the Current Year Number and the Destiny Number.
+Look at the planets associated with these numbers. Additionally, consider the mutual synergy and enmity between these planets.
+Provide a very detailed and elaborate analysis for the current year's events, challenges, and opportunities in each of the following fields:
+- Health: discuss in detail in at least 200 words
+- Family & Relationships: discuss in detail in at least 200 words
+- Education: discuss in detail in at least 200 words
+- Career: discuss in detail in at least 200 words
+- Money and Savings: discuss in detail in at least 200 words
+- Overall Happiness: discuss in detail in at least 200 words
+""",
+    "synthesis": """\
+## 6. Holistic Synthesis
+Integrate all numbers into a cohesive life-purpose narrative, illustrating how strengths overcome gaps and how challenges become catalysts for growth.
+""",
+    "action_plan": """\
+## 7. Action Plan & Affirmations
+- Immediate Steps (Next 30 Days): Three concrete actions.
+- Long-Term Goals (Next Year): Major milestones aligned with numerology.
+- Remedies: Identify the squares (at least 3 to 4) which are relatively weak, negative or have missing numbers in the Lo Shu Grid. Identify planets associated with these weak, empty and negative squares. Suggest the remedies related to these planets (as per Vedic Astrology) to strengthen these weak, negative and missing squares.
+""",
+    "final_wisdom": """\
+## 8. Final Wisdom
+Conclude with an inspiring message that highlights the person’s soul mission, unique gifts, soul purpose, and the pathways to a fulfilling, balanced life their numbers reveal.
+""",
+}
+
+CLOSING = "Please ensure every section provides specific, actionable insights tailored to this person's unique numerological blueprint.\n"
+
+# System message for a full reading, and one per section for sectioned readings.
+SYSTEM_PROMPT = "\n".join([ROLE, "Reading structure:", *SECTIONS.values(), CLOSING])
+SECTION_SYSTEM_PROMPTS = {
+    section: "\n".join([ROLE, "Write only the following part of a larger reading. Do not add an introduction, a conclusion, or any other sections.", text, CLOSING])
+    for section, text in SECTIONS.items()
+}
+
+# System message for an assembled reading: sections 1 to 4 come from the fragment library
+# (LoShu_fragments), and the model writes only the parts that need the whole chart at once.
+ASSEMBLED_SYNTHESIS = """\
+## 6. Holistic Synthesis
+Integrate all numbers into a cohesive life-purpose narrative. Discuss how the Psychic, Destiny, Name and Kua Numbers combine, based on the planets they govern and the synergy and enmity of those planets, and how strengths overcome gaps.
+Then give three concrete actions for the next 30 days, and remedies (as per Vedic Astrology) for the planets of the weakest or missing squares in the Lo Shu Grid.
+Close with a short, inspiring message about the person's soul purpose. Keep this section under 400 words.
+"""
+ASSEMBLED_SYSTEM_PROMPT = "\n".join([
+    ROLE,
+    "Sections 1 to 4 of this reading (squares, planes, core numbers and life domains) have already been written. Write only the following sections, with the headings shown.",
+    SECTIONS["current_year"],
+    ASSEMBLED_SYNTHESIS,
+    CLOSING,
+])
+
+CHART_DATA = """\
+Chart data:
+- First Name: {name}
+- Date of Birth: {day}-{month}-{year}
+- Gender: {gender}
+- Psychic Number (Birth Number): {psychic}
+- Destiny Number (Life Path Number): {destiny}
+- Name Number (Expression Number): {name_number}
+- Kua Number: {kua}
+- Numbers in their chart: {grid_data}
+- Missing Numbers: {missing_numbers}
+- Completed Planes: {completed_planes_str}
+- Incomplete Planes: {incomplete_planes_str}
+- Current Year Number: {curr_year_num}
+"""
+
+
+def chart_facts(name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes):
+    """Collects the values the chart data block is filled with."""
+    return {
+        "name": name,
+        "day": day,
+        "month": month,
+        "year": year,
+        "gender": gender,
+        "psychic": psychic,
+        "destiny": destiny,
+        "kua": kua,
+        "name_number": name_number,
+        "curr_year_num": curr_year_num,
+        "grid_data": ", ".join([f"{num} (appears {count} time{'s' if count > 1 else ''})" for num, count in counts.items() if count > 0]) or 'None',
+        "missing_numbers": ", ".join([str(num) for num, count in counts.items() if count == 0]) or 'None',
+        "completed_planes_str": ", ".join(completed_planes) if completed_planes else 'None',
+        "incomplete_planes_str": ", ".join(incomplete_planes) if incomplete_planes else 'None',
+    }
+
+
+def build_messages(facts):
+    """Builds the (system, human) messages for a full reading covering every section."""
+    return [
+        ("system", SYSTEM_PROMPT),
+        ("human", CHART_DATA.format(**facts) + "\nWrite the complete reading, sections 1 to 8."),
+    ]
+
+
+def build_section_messages(section, facts):
+    """Builds the messages for a single section of the reading."""
+    return [
+        ("system", SECTION_SYSTEM_PROMPTS[section]),
+        ("human", CHART_DATA.format(**facts) + "\nWrite only this section."),
+    ]
+
+
+def build_assembled_messages(facts):
+    """Builds the messages for the live part of an assembled reading."""
+    return [
+        ("system", ASSEMBLED_SYSTEM_PROMPT),
+        ("human", CHART_DATA.format(**facts) + "\nWrite only sections 5 and 6."),
+    ]
+
+
+# --- Token Accounting ---
+
+def estimate_tokens(text):
+    """Rough token count for English prose: about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def token_usage(messages, completion="", usage_metadata=None):
+    """Reports the token cost of one request.
+
+    Uses the provider's counts when the response carries `usage_metadata`, and estimates
+    otherwise. `static_input_tokens` is the share of the input that is identical for every
+    person and so eligible for provider-side prefix caching.
+    """
+    static_input = sum(estimate_tokens(text) for role, text in messages if role == "system")
+    if usage_metadata:
+        return {
+            "input_tokens": usage_metadata.get("input_tokens", 0),
+            "output_tokens": usage_metadata.get("output_tokens", 0),
+            "static_input_tokens": static_input,
+            "estimated": False,
+        }
+    return {
+        "input_tokens": sum(estimate_tokens(text) for _, text in messages),
+        "output_tokens": estimate_tokens(completion),
+        "static_input_tokens": static_input,
+        "estimated": True,
+    }
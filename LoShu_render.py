@@ -0,0 +1,239 @@
+import html
+import re
+from functools import lru_cache
+from string import Template
+
+
+# --- Report Rendering ---
+#
+# HTML fragments shared by the Streamlit page and offline tools. Kept free of Streamlit so
+# they can be imported and benchmarked without running the app.
+
+GRID_LAYOUT = [[4, 9, 2], [3, 5, 7], [8, 1, 6]]
+
+GRID_CSS = """
+    /* --- Custom Lo Shu Grid --- */
+    .grid-container {
+        display: grid;
+        grid-template-columns: repeat(3, 1fr);
+        gap: 10px;
+        width: 100%;
+        max-width: 300px;
+        margin: auto;
+        aspect-ratio: 1 / 1;
+    }
+    .grid-cell {
+        background-color: #f8f9fa;
+        color: #ced4da;
+        border-radius: 10px;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-size: 2rem;
+        font-weight: bold;
+        border: 2px solid #e9ecef;
+    }
+    .grid-cell.present {
+        background-color: #e6f9f1;
+        color: #0c854e;
+        border: 2px solid #a3e9d1;
+    }
+    .grid-cell.multiple {
+        background-color: #d1f3e3;
+        color: #0a6b3e;
+        border: 2px solid #77d9b4;
+        font-weight: 900;
+    }
+    .grid-cell-inner {
+        position: relative;
+    }
+    .grid-count {
+        position: absolute;
+        top: -8px;
+        right: -15px;
+        font-size: 1rem;
+        font-weight: bold;
+        color: #dd2c00;
+        background-color: #fff;
+        border-radius: 50%;
+        padding: 2px 5px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+"""
+
+_CELL = '<div class="{}"><div class="grid-cell-inner">{}{}</div></div>'
+
+
+def grid_pattern(counts):
+    """The counts of 1-9 as a tuple, the key grid fragments are memoized on."""
+    return tuple(counts.get(num, 0) for num in range(1, 10))
+
+
+@lru_cache(maxsize=4096)
+def _grid_html(pattern):
+    cells = []
+    for row in GRID_LAYOUT:
+        for num in row:
+            count = pattern[num - 1]
+            if count == 0:
+                # Display a dash for missing numbers
+                cells.append(_CELL.format("grid-cell", "—", ""))
+            elif count == 1:
+                cells.append(_CELL.format("grid-cell present", num, ""))
+            else:
+                cells.append(_CELL.format("grid-cell present multiple", num, f'<span class="grid-count">{count}</span>'))
+    return '<div class="grid-container">' + "".join(cells) + '</div>'
+
+
+def create_grid_html(counts):
+    """Generates a styled HTML representation of the Lo Shu Grid.
+
+    Charts share only a few thousand count patterns, so each pattern is rendered once.
+    """
+    return _grid_html(grid_pattern(counts))
+
+
+# --- Static Reports ---
+#
+# A report is a dict with the fields LoShu_bulk writes for each record: name, day, month, year,
+# gender, counts (nine counts for 1-9), psychic, destiny, kua, name_number, curr_year_num,
+# completed_planes, incomplete_planes and, optionally, reading (markdown).
+
+REPORT_CSS = GRID_CSS + """
+    body { background-color: #f0f2f6; font-family: Helvetica, Arial, sans-serif; color: #1f2937; margin: 0; padding: 24px; }
+    main { max-width: 900px; margin: auto; }
+    h1, h2, h3 { color: #1e3a8a; }
+    h1 { text-align: center; }
+    .card { background-color: #ffffff; border-radius: 15px; padding: 25px; box-shadow: 0 4px 12px rgba(0,0,0,0.08); margin-top: 20px; border: 1px solid #e0e0e0; }
+    .numbers { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; text-align: center; }
+    .numbers b { display: block; font-size: 2rem; color: #1e3a8a; }
+    .complete { color: #0c854e; }
+    .incomplete { color: #dd2c00; }
+    @media print { body { background: none; } .card { box-shadow: none; break-inside: avoid; } }
+"""
+
+REPORT_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Lo Shu Grid Report: $name</title>
+<style>$css</style>
+</head>
+<body>
+<main>
+<h1>Lo Shu Grid Numerology Report</h1>
+<section class="card">
+<h2>Personal Information</h2>
+<p>Name: $name<br>Date of Birth: $dob<br>Gender: $gender</p>
+</section>
+<section class="card">
+<h2>Your Core Numbers</h2>
+<div class="numbers">$numbers</div>
+</section>
+<section class="card">
+<h2>Your Lo Shu Grid</h2>
+$grid
+</section>
+<section class="card">
+<h2>Planes Analysis</h2>
+<h3>Completed Planes</h3>
+<ul>$completed</ul>
+<h3>Incomplete Planes</h3>
+<ul>$incomplete</ul>
+</section>
+$reading
+</main>
+</body>
+</html>
+""")
+READING_TEMPLATE = Template("""<section class="card">
+<h2>Your Detailed Numerology Reading</h2>
+$body
+</section>""")
+_NUMBER = "<div><b>{}</b>{}</div>"
+_PLANE = '<li class="{}">{} {}</li>'
+
+
+def report_counts(report):
+    """A report's grid counts as the {number: count} dict the rest of the app uses."""
+    counts = report["counts"]
+    if isinstance(counts, dict):
+        return {int(num): count for num, count in counts.items()}
+    return {num: counts[num - 1] for num in range(1, 10)}
+
+
+def core_numbers(report):
+    return [
+        ("Psychic Number", report["psychic"]),
+        ("Destiny Number", report["destiny"]),
+        ("Name Number", report["name_number"]),
+        ("Kua Number", report["kua"]),
+    ]
+
+
+def report_dob(report):
+    return f"{report['day']:02d}-{report['month']:02d}-{report['year']}"
+
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def markdown_blocks(text):
+    """Splits reading markdown into (kind, text) blocks: h1-h3, item and paragraph.
+
+    Covers what readings use: # headings, "-" or "*" bullets and plain paragraphs.
+    """
+    blocks = []
+    for line in text.splitlines():
+        line = _BOLD.sub(r"\1", line.strip())
+        if not line:
+            continue
+        heading = re.match(r"(#{1,3})\s+(.*)", line)
+        if heading:
+            blocks.append((f"h{len(heading.group(1))}", heading.group(2)))
+        elif line[:2] in ("- ", "* "):
+            blocks.append(("item", line[2:]))
+        else:
+            blocks.append(("paragraph", line))
+    return blocks
+
+
+def markdown_to_html(text):
+    """Converts reading markdown to HTML, escaping everything else."""
+    parts = []
+    in_list = False
+    for kind, content in markdown_blocks(text):
+        if (kind == "item") != in_list:
+            parts.append("<ul>" if not in_list else "</ul>")
+            in_list = not in_list
+        content = html.escape(content)
+        if kind == "item":
+            parts.append(f"<li>{content}</li>")
+        elif kind == "paragraph":
+            parts.append(f"<p>{content}</p>")
+        else:
+            # Reading headings sit below the card's own h2.
+            level = min(int(kind[1]) + 1, 4)
+            parts.append(f"<h{level}>{content}</h{level}>")
+    if in_list:
+        parts.append("</ul>")
+    return "\n".join(parts)
+
+
+def render_report_html(report):
+    """Renders a report as a standalone HTML page."""
+    escape = html.escape
+    completed = "".join(_PLANE.format("complete", "✓", escape(plane)) for plane in report["completed_planes"]) or "<li>No completed planes found.</li>"
+    incomplete = "".join(_PLANE.format("incomplete", "✗", escape(plane)) for plane in report["incomplete_planes"]) or "<li>All planes are complete!</li>"
+    reading = report.get("reading")
+    return REPORT_TEMPLATE.substitute(
+        name=escape(report["name"]),
+        dob=report_dob(report),
+        gender=escape(report["gender"]),
+        css=REPORT_CSS,
+        numbers="".join(_NUMBER.format(value, label) for label, value in core_numbers(report)),
+        grid=create_grid_html(report_counts(report)),
+        completed=completed,
+        incomplete=incomplete,
+        reading=READING_TEMPLATE.substitute(body=markdown_to_html(reading)) if reading else "",
+    )
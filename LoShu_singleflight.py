@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+# --- Request Coalescing ---
+
+class _Flight:
+    def __init__(self):
+        self.future = Future()
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the work; callers that arrive while it is in flight wait
+    for and share its outcome, including its exception. A key is released as soon as its work
+    finishes, so a failure never sticks to later attempts.
+
+    `on_join`, if given, is called as on_join(key, leader) each time a caller joins a flight.
+    """
+
+    def __init__(self, on_join=None):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._on_join = on_join
+
+    def _join(self, key):
+        """Returns (flight, is_leader) for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if self._on_join is not None:
+            self._on_join(key, leader)
+        return flight, leader
+
+    def _release(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._flights
+
+    def do(self, key, fn):
+        """Returns fn(), or the result of the identical call already in flight."""
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            self._release(key, flight)
+
+    async def ado(self, key, coro_fn):
+        """Async form of `do`; waiters may be on any event loop or thread."""
+        flight, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(flight.future)
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            self._release(key, flight)
+
+    def stream(self, key, make_iter):
+        """Yields the chunks of make_iter(), shared with every concurrent caller for `key`.
+
+        The iterator is driven on a background thread, so it runs to completion even if every
+        caller stops reading. Callers that join late first receive the chunks already produced.
+        If the iterator fails, each caller gets its chunks so far and then the exception.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, make_iter), daemon=True).start()
+        consumed = 0
+        while True:
+            with flight.condition:
+                while consumed == len(flight.chunks) and not flight.done:
+                    flight.condition.wait()
+                chunks = flight.chunks[consumed:]
+                consumed += len(chunks)
+                finished = flight.done and consumed == len(flight.chunks)
+                error = flight.error
+            yield from chunks
+            if finished:
+                if error is not None:
+                    raise error
+                return
+
+    def _produce(self, key, flight, make_iter):
+        try:
+            for chunk in make_iter():
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            self._release(key, flight)
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
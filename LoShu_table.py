@@ -0,0 +1,130 @@
+import argparse
+import os
+import struct
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from LoShu_batch import ChartBatch, calculate_numbers_batch, check_planes_batch
+
+
+# --- Precomputed Chart Table ---
+
+# Location of the table file; override with the LOSHU_TABLE_PATH environment variable.
+DEFAULT_TABLE_PATH = os.environ.get("LOSHU_TABLE_PATH", "loshu_charts.bin")
+DEFAULT_START = date(1900, 1, 1)
+# The table runs this many years past the current one, so date searches can plan ahead.
+DEFAULT_YEARS_AHEAD = 50
+
+# File layout: a 16-byte header (magic, first date ordinal, number of dates) followed by a
+# (dates, 2, 12) uint8 array. The gender axis is 0 = male, 1 = female, and each row holds the
+# nine date-only grid counts followed by psychic, destiny and kua.
+_MAGIC = b"LOSHUTB1"
+_HEADER = struct.Struct("<8sii")
+_ROW = 12
+
+
+def build_chart_table(path=DEFAULT_TABLE_PATH, start=DEFAULT_START, end=None):
+    """Precomputes the date-derived chart of every (date, gender) from `start` to `end`.
+
+    `end` defaults to the last day of the year DEFAULT_YEARS_AHEAD years from now. The name
+    number is left out of the stored counts and added at lookup time. Returns the path written.
+    """
+    end = end or date(date.today().year + DEFAULT_YEARS_AHEAD, 12, 31)
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    years = dates.astype("M8[Y]").astype(np.int64) + 1970
+    months = dates.astype("M8[M]").astype(np.int64) % 12 + 1
+    days = (dates - dates.astype("M8[M]")).astype(np.int64) + 1
+
+    table = np.empty((len(dates), 2, _ROW), dtype=np.uint8)
+    no_name = np.zeros(len(dates), dtype=np.uint8)
+    for gender_index, gender in enumerate(("Male", "Female")):
+        counts, psychic, destiny, kua, _ = calculate_numbers_batch(days, months, years, np.full(len(dates), gender), no_name)
+        table[:, gender_index, :9] = counts
+        table[:, gender_index, 9] = psychic
+        table[:, gender_index, 10] = destiny
+        table[:, gender_index, 11] = kua
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, start.toordinal(), len(dates)))
+        f.write(table.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+class ChartTable:
+    """Read-only, memory-mapped view of a table written by build_chart_table.
+
+    The file is mapped rather than read, so every process that opens the same table shares
+    one copy through the OS page cache.
+    """
+
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        with open(path, "rb") as f:
+            magic, start_ordinal, n_dates = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a Lo Shu chart table.")
+        self.path = path
+        self.start = date.fromordinal(start_ordinal)
+        self.n_dates = n_dates
+        self._table = np.memmap(path, dtype=np.uint8, mode="r", offset=_HEADER.size, shape=(n_dates, 2, _ROW))
+
+    def rows(self):
+        """The whole table as a read-only (dates, 2, 12) array, laid out as in the file."""
+        return self._table
+
+    def lookup(self, name_number, day, month, year, gender):
+        """Returns the same (counts, psychic, destiny, kua, name_number) tuple as calculate_numbers."""
+        index = date(year, month, day).toordinal() - self.start.toordinal()
+        if not 0 <= index < self.n_dates:
+            raise ValueError(f"{day:02d}-{month:02d}-{year} is outside the chart table.")
+        row = self._table[index, 0 if gender.lower() == "male" else 1]
+        counts = {i: int(row[i - 1]) for i in range(1, 10)}
+        if name_number > 0:
+            counts[name_number] += 1
+        return counts, int(row[9]), int(row[10]), int(row[11]), name_number
+
+    def lookup_batch(self, days, months, years, genders, name_numbers):
+        """Vectorized lookup returning a ChartBatch, like LoShu_batch.calculate_batch."""
+        indices = self.date_indices(days, months, years)
+        genders = np.asarray(genders)
+        is_male = genders if genders.dtype == bool else np.char.lower(genders.astype(str)) == "male"
+        rows = np.asarray(self._table[indices, np.where(is_male, 0, 1)])
+
+        name_numbers = np.asarray(name_numbers, dtype=np.uint8)
+        counts = rows[:, :9].copy()
+        named = np.flatnonzero(name_numbers > 0)
+        counts[named, name_numbers[named] - 1] += 1
+        return ChartBatch(counts, rows[:, 9], rows[:, 10], rows[:, 11], name_numbers, check_planes_batch(counts))
+
+    def date_indices(self, days, months, years):
+        """Maps arrays of birth dates to table rows, rejecting invalid or out-of-range dates."""
+        days = np.asarray(days, dtype=np.int64)
+        months = np.asarray(months, dtype=np.int64)
+        years = np.asarray(years, dtype=np.int64)
+        month_starts = (years - 1970).astype("M8[Y]").astype("M8[M]") + (months - 1)
+        dates = month_starts.astype("M8[D]") + (days - 1)
+        valid = (months >= 1) & (months <= 12) & (days >= 1) & (dates.astype("M8[M]") == month_starts)
+        indices = (dates - np.datetime64(self.start, "D")).astype(np.int64)
+        valid &= (indices >= 0) & (indices < self.n_dates)
+        if not valid.all():
+            raise ValueError(f"{np.count_nonzero(~valid)} date(s) are invalid or outside the chart table.")
+        return indices
+
+
+@lru_cache(maxsize=None)
+def open_chart_table(path=DEFAULT_TABLE_PATH):
+    """Returns a shared ChartTable for `path`, mapping the file once per process."""
+    return ChartTable(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the precomputed Lo Shu chart table.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TABLE_PATH)
+    parser.add_argument("--start-year", type=int, default=DEFAULT_START.year)
+    parser.add_argument("--end-year", type=int, default=date.today().year + DEFAULT_YEARS_AHEAD)
+    args = parser.parse_args()
+    written = build_chart_table(args.path, date(args.start_year, 1, 1), date(args.end_year, 12, 31))
+    print(f"Wrote {written}")
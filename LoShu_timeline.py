@@ -0,0 +1,69 @@
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+
+from LoShu_batch import digital_root
+from LoShu_compat import number_affinity
+
+
+# --- Personal Year Timeline ---
+#
+# Personal year numbers, and how each year's number sits with the destiny number, for any range
+# of years and any number of people, as one broadcast array operation. The personal year number
+# of a year is the digital root of day + month + year (see LoShu_core.personal_year).
+
+DEFAULT_SPAN = 100
+
+
+class Timeline(NamedTuple):
+    """Personal years of one person (arrays of shape (Y,)) or of N people (shape (N, Y))."""
+    years: np.ndarray          # (Y,) int64, the calendar years covered
+    personal_year: np.ndarray  # personal year number, uint8
+    combined: np.ndarray       # digital root of personal year + destiny number, uint8
+    affinity: np.ndarray       # friendship of their ruling planets, -1 (enemies) to 1 (friends), float32
+
+
+def year_range(start_year=None, end_year=None, span=DEFAULT_SPAN, today=None):
+    """Years from `start_year` (default the year of `today`) to `end_year` inclusive, or `span` years."""
+    start_year = (today or date.today()).year if start_year is None else start_year
+    end_year = start_year + span - 1 if end_year is None else end_year
+    return np.arange(start_year, end_year + 1, dtype=np.int64)
+
+
+def personal_years(days, months, years):
+    """Vectorized personal_year; days and months get a trailing axis, so the result is (..., Y)."""
+    days = np.asarray(days, dtype=np.int64)[..., None]
+    months = np.asarray(months, dtype=np.int64)[..., None]
+    return digital_root(days + months + np.asarray(years, dtype=np.int64))
+
+
+def timeline(days, months, destiny, start_year=None, end_year=None, span=DEFAULT_SPAN, today=None):
+    """Personal years and their interaction with the destiny number over a range of years.
+
+    `days`, `months` and `destiny` are scalars for one person or length-N arrays for a batch.
+    The range runs from `start_year` (default the year of `today`, itself defaulting to the
+    current date) to `end_year`, or for `span` years.
+    """
+    years = year_range(start_year, end_year, span, today)
+    return _timeline(years, personal_years(days, months, years), destiny)
+
+
+def life_cycle(day, month, year, destiny, span=DEFAULT_SPAN):
+    """The timeline of `span` years starting from each birth year; shapes (Y,) or (N, Y).
+
+    `years` then holds ages 0 to span - 1 rather than calendar years, since birth years differ.
+    """
+    ages = np.arange(span, dtype=np.int64)
+    years = np.asarray(year, dtype=np.int64)[..., None] + ages
+    return _timeline(ages, personal_years(day, month, years), destiny)
+
+
+def _timeline(years, personal, destiny):
+    destiny = np.asarray(destiny, dtype=np.int64)[..., None]
+    return Timeline(
+        years=years,
+        personal_year=personal,
+        combined=digital_root(personal + destiny),
+        affinity=number_affinity(personal, destiny).astype(np.float32),
+    )
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 import LoShu_backend
+import LoShu_metrics
+from LoShu_render import GRID_CSS, create_grid_html
 
 # --- Streamlit Page Configuration ---
 st.set_page_config(
@@ -11,6 +13,9 @@ st.set_page_config(
     page_icon = "🔮",
 )
 
+# Serve Prometheus metrics when LOSHU_METRICS_PORT is set; a no-op on reruns.
+LoShu_metrics.start_metrics_server()
+
 # --- Custom CSS for Styling ---
 st.markdown("""
 <style>
@@ -55,82 +60,12 @@ st.markdown("""
         margin-top: 20px;
         border: 1px solid #e0e0e0;
     }
-    
-    /* --- Custom Lo Shu Grid --- */
-    .grid-container {
-        display: grid;
-        grid-template-columns: repeat(3, 1fr);
-        gap: 10px;
-        width: 100%;
-        max-width: 300px;
-        margin: auto;
-        aspect-ratio: 1 / 1;
-    }
-    .grid-cell {
-        background-color: #f8f9fa;
-        color: #ced4da;
-        border-radius: 10px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 2rem;
-        font-weight: bold;
-        border: 2px solid #e9ecef;
-    }
-    .grid-cell.present {
-        background-color: #e6f9f1;
-        color: #0c854e;
-        border: 2px solid #a3e9d1;
-    }
-    .grid-cell.multiple {
-        background-color: #d1f3e3;
-        color: #0a6b3e;
-        border: 2px solid #77d9b4;
-        font-weight: 900;
-    }
-    .grid-cell-inner {
-        position: relative;
-    }
-    .grid-count {
-        position: absolute;
-        top: -8px;
-        right: -15px;
-        font-size: 1rem;
-        font-weight: bold;
-        color: #dd2c00;
-        background-color: #fff;
-        border-radius: 50%;
-        padding: 2px 5px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
 </style>
 """, unsafe_allow_html=True)
+st.markdown(f"<style>{GRID_CSS}</style>", unsafe_allow_html=True)
 
 
 
-def create_grid_html(counts):
-    """Generates a styled HTML representation of the Lo Shu Grid."""
-    grid_layout = [[4, 9, 2], [3, 5, 7], [8, 1, 6]]
-    html = '<div class="grid-container">'
-    for row in grid_layout:
-        for num in row:
-            count = counts.get(num, 0)
-            cell_class = "grid-cell"
-            content = str(num)
-            count_badge = ""
-
-            if count > 0:
-                cell_class += " present"
-                if count > 1:
-                    cell_class += " multiple"
-                    count_badge = f'<span class="grid-count">{count}</span>'
-            else:
-                 content = "—" # Display a dash for missing numbers
-
-            html += f'<div class="{cell_class}"><div class="grid-cell-inner">{content}{count_badge}</div></div>'
-    html += '</div>'
-    return html
-
 # --- UI Layout ---
 
 st.title("🔮 AI Powered Lo Shu Grid Numerology Calculator")
@@ -158,85 +93,132 @@ with st.container():
 
 
 # --- Processing and Output ---
+#
+# Streamlit reruns this script on every interaction, so the last submitted chart and its reading
+# are kept in st.session_state["report"] and redrawn from there. They are only recomputed when the
+# button is pressed with different inputs.
+
+@st.cache_data(show_spinner=False, max_entries=1024)
+def compute_chart(name, day, month, year, gender, today):
+    """The numbers, planes and year number of a profile; `today` keys the year number."""
+    with LoShu_metrics.span("calculate_numbers"):
+        counts, psychic, destiny, kua, name_number = LoShu_backend.calculate_numbers(name, day, month, year, gender)
+    with LoShu_metrics.span("check_planes"):
+        completed_planes, incomplete_planes = LoShu_backend.check_planes(counts)
+    with LoShu_metrics.span("year_number"):
+        curr_year_num = LoShu_backend.year_number(day, month, today)
+    return {
+        "counts": counts, "psychic": psychic, "destiny": destiny, "kua": kua, "name_number": name_number,
+        "completed_planes": completed_planes, "incomplete_planes": incomplete_planes, "curr_year_num": curr_year_num,
+    }
+
 if submit_button:
     if not name.strip():
         st.error("Please enter a name.")
     else:
         try:
             datetime(year, month, day)
-
-            with st.spinner("Analyzing the cosmos for your report... This may take a moment."):
-                # --- Backend Calculations ---
-                counts, psychic, destiny, kua, name_number = LoShu_backend.calculate_numbers(name, day, month, year, gender)
-                completed_planes, incomplete_planes = LoShu_backend.check_planes(counts)
-                curr_year_num = LoShu_backend.year_number(day, month)
-                today = date.today()
-                age = today.year - year - ((today.month, today.day) < (month, day))
-                dob = f"{day:02d}-{month:02d}-{year}"
-
-                # --- Display Personal Information in a Card ---
-                st.markdown('<div class="card">', unsafe_allow_html=True)
-                st.header("Personal Information")
-                info_col1, info_col2, info_col3 = st.columns(3)
-                info_col1.metric("Name", name)
-                info_col2.metric("Age", age)
-                info_col3.metric("Date of Birth", dob)
-                st.markdown('</div>', unsafe_allow_html=True)
-
-                # --- Display Core Numbers in a Card ---
-                st.markdown('<div class="card">', unsafe_allow_html=True)
-                st.header("Your Core Numbers")
-                num_col1, num_col2, num_col3, num_col4 = st.columns(4)
-                num_col1.metric("Psychic Number", psychic, help="Represents your inner self and basic character.")
-                num_col2.metric("Destiny Number", destiny, help="Represents your life's purpose and path.")
-                num_col3.metric("Name Number", name_number, help="Represents your talents and mode of expression.")
-                num_col4.metric("Kua Number", kua, help="Represents your personal energy and compatibility.")
-                st.markdown('</div>', unsafe_allow_html=True)
-
-                # --- Display Grid and Planes in separate cards ---
-                grid_col, plane_col = st.columns([1, 1])
-                with grid_col:
-                    st.markdown('<div class="card">', unsafe_allow_html=True)
-                    st.header("Your Lo Shu Grid ⊞")
-                    grid_html = create_grid_html(counts)
-                    st.markdown(grid_html, unsafe_allow_html=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-
-                with plane_col:
-                    st.markdown('<div class="card" style="height: 100%;">', unsafe_allow_html=True)
-                    st.header("Planes Analysis ▦")
-
-                    st.subheader("Completed Planes")
-                    if completed_planes:
-                        for plane in completed_planes:
-                            st.success(f"✓ {plane}")
-                    else:
-                        st.info("No completed planes found.")
-
-                    st.subheader("Incomplete Planes")
-                    if incomplete_planes:
-                        for plane in incomplete_planes:
-                            st.error(f"✗ {plane}")
-                    else:
-                        st.balloons()
-                        st.success("Congratulations! All planes are complete!")
-
-                    st.markdown('</div>', unsafe_allow_html=True)
-
-
-                # --- Generate and Display AI Interpretation in a Card ---
-                st.markdown('<div class="card">', unsafe_allow_html=True)
-                st.header("Your Detailed Numerology Reading ☯")
-                interpretation = LoShu_backend.generate_interpretation(
-                    name, day, month, year, gender, psychic, destiny, kua, name_number, curr_year_num, counts, completed_planes, incomplete_planes
-                )
-                st.markdown(interpretation)
-                st.markdown('</div>', unsafe_allow_html=True)
-
-        except ValueError:
+            inputs = (name, day, month, year, gender, date.today())
+            report = st.session_state.get("report")
+            if report is None or report["inputs"] != inputs:
+                with st.spinner("Analyzing the cosmos for your report... This may take a moment."):
+                    st.session_state["report"] = {"inputs": inputs, "chart": compute_chart(*inputs), "reading": None, "reading_failed": False}
+            else:
+                # Same inputs as the report on screen: keep it, but allow a failed reading to be retried.
+                report["reading_failed"] = False
+        except ValueError as e:
+            LoShu_metrics.record_error("request", e)
             st.error("Invalid date. Please check the day, month, and year.")
         except Exception as e:
-            st.error(f"An unexpected error occurred. Please ensure your API key is correctly configured. Error: {e}")
+            LoShu_metrics.record_error("request", e)
+            st.error(f"An unexpected error occurred. Error ({type(e).__name__}): {e}")
+
+report = st.session_state.get("report")
+if report is not None:
+    name, day, month, year, gender, today = report["inputs"]
+    chart = report["chart"]
+    counts, completed_planes, incomplete_planes = chart["counts"], chart["completed_planes"], chart["incomplete_planes"]
+    age = today.year - year - ((today.month, today.day) < (month, day))
+    dob = f"{day:02d}-{month:02d}-{year}"
+
+    # --- Display Personal Information in a Card ---
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.header("Personal Information")
+    info_col1, info_col2, info_col3 = st.columns(3)
+    info_col1.metric("Name", name)
+    info_col2.metric("Age", age)
+    info_col3.metric("Date of Birth", dob)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # --- Display Core Numbers in a Card ---
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.header("Your Core Numbers")
+    num_col1, num_col2, num_col3, num_col4 = st.columns(4)
+    num_col1.metric("Psychic Number", chart["psychic"], help="Represents your inner self and basic character.")
+    num_col2.metric("Destiny Number", chart["destiny"], help="Represents your life's purpose and path.")
+    num_col3.metric("Name Number", chart["name_number"], help="Represents your talents and mode of expression.")
+    num_col4.metric("Kua Number", chart["kua"], help="Represents your personal energy and compatibility.")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # --- Display Grid and Planes in separate cards ---
+    grid_col, plane_col = st.columns([1, 1])
+    with grid_col:
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.header("Your Lo Shu Grid ⊞")
+        grid_html = create_grid_html(counts)
+        st.markdown(grid_html, unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    with plane_col:
+        st.markdown('<div class="card" style="height: 100%;">', unsafe_allow_html=True)
+        st.header("Planes Analysis ▦")
+
+        st.subheader("Completed Planes")
+        if completed_planes:
+            for plane in completed_planes:
+                st.success(f"✓ {plane}")
+        else:
+            st.info("No completed planes found.")
+
+        st.subheader("Incomplete Planes")
+        if incomplete_planes:
+            for plane in incomplete_planes:
+                st.error(f"✗ {plane}")
+        else:
+            if submit_button:
+                st.balloons()
+            st.success("Congratulations! All planes are complete!")
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+    # --- Generate and Display AI Interpretation in a Card ---
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.header("Your Detailed Numerology Reading ☯")
+    if report["reading"] is not None:
+        st.markdown(report["reading"])
+    elif report["reading_failed"]:
+        st.info("The reading could not be generated. Press the button again to retry.")
+    else:
+        # Stream the reading into the card so text appears as soon as the model starts writing.
+        # A rerun that interrupted an earlier stream rejoins it, or finds it in the reading cache.
+        try:
+            with LoShu_metrics.span("reading"):
+                report["reading"] = st.write_stream(LoShu_backend.stream_interpretation(
+                    name, day, month, year, gender, chart["psychic"], chart["destiny"], chart["kua"], chart["name_number"],
+                    chart["curr_year_num"], counts, completed_planes, incomplete_planes
+                ))
+        except LoShu_backend.LLMUnavailableError as e:
+            report["reading_failed"] = True
+            LoShu_metrics.record_error("request", e)
+            st.warning(f"The reading service is busy or unreachable right now. Please try again in a minute. ({e})")
+        except Exception as e:
+            report["reading_failed"] = True
+            LoShu_metrics.record_error("request", e)
+            st.error(f"An unexpected error occurred. Please ensure your API key is correctly configured. Error ({type(e).__name__}): {e}")
+        finally:
+            LoShu_metrics.write_prometheus()
+    st.markdown('</div>', unsafe_allow_html=True)
 
 
 # --- Sidebar Configuration ---